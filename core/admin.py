@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils import timezone
-from .models import BusinessProfile, Client, Invoice, InvoiceItem, AdClick
+from .models import BusinessProfile, Client, Invoice, InvoiceItem, AdClick, ExchangeRateTable, ExchangeRate, UserInvoiceStats, InvoiceSequence, EmailOutbox, PdfRenderJob, InvoiceExport
+from .overdue import wake_overdue_timers
+from .pdf_jobs import enqueue_pdf_render
 
 @admin.register(BusinessProfile)
 class BusinessProfileAdmin(admin.ModelAdmin):
@@ -55,25 +58,31 @@ class InvoiceAdmin(admin.ModelAdmin):
         return '✓ No'
     is_overdue_display.short_description = 'Overdue'
     
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # The inline items are saved after the invoice, so bring its totals in line with them
+        Invoice.objects.filter(pk=form.instance.pk).recalculate_totals()
+    
     actions = ['mark_as_paid', 'mark_as_sent', 'update_overdue_status']
     
     def mark_as_paid(self, request, queryset):
-        updated = queryset.update(status='paid')
+        updated = queryset.set_status('paid')
         self.message_user(request, f'{updated} invoice(s) marked as paid.')
     mark_as_paid.short_description = 'Mark selected invoices as paid'
     
     def mark_as_sent(self, request, queryset):
-        updated = queryset.update(status='sent')
+        with transaction.atomic():
+            invoices = list(queryset.exclude(status='sent').only('pk'))
+            updated = Invoice.objects.filter(pk__in=[invoice.pk for invoice in invoices]).set_status('sent')
+            # Render the sent PDFs ahead of the first download, as the invoice form does
+            for invoice in invoices:
+                enqueue_pdf_render(invoice)
+            transaction.on_commit(wake_overdue_timers)
         self.message_user(request, f'{updated} invoice(s) marked as sent.')
     mark_as_sent.short_description = 'Mark selected invoices as sent'
     
     def update_overdue_status(self, request, queryset):
-        now = timezone.now()
-        updated = 0
-        for invoice in queryset.filter(status='sent', due_date__lt=now):
-            invoice.status = 'overdue'
-            invoice.save()
-            updated += 1
+        updated = queryset.mark_overdue()
         self.message_user(request, f'{updated} invoice(s) updated to overdue.')
     update_overdue_status.short_description = 'Update overdue status'
 
@@ -86,4 +95,62 @@ class InvoiceItemAdmin(admin.ModelAdmin):
 class AdClickAdmin(admin.ModelAdmin):
     list_display = ['ad_identifier', 'ad_placement', 'user', 'timestamp', 'target_url']
     search_fields = ['ad_identifier', 'user__username', 'target_url']
-    list_filter = ['ad_placement', 'timestamp']
\ No newline at end of file
+    list_filter = ['ad_placement', 'timestamp']
+
+@admin.register(ExchangeRateTable)
+class ExchangeRateTableAdmin(admin.ModelAdmin):
+    list_display = ['base_currency', 'fetched_at']
+    readonly_fields = ['fetched_at']
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ['rate_date', 'base_currency', 'quote_currency', 'rate', 'fetched_at']
+    list_filter = ['rate_date', 'base_currency', 'quote_currency']
+
+@admin.register(UserInvoiceStats)
+class UserInvoiceStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'currency', 'invoice_count', 'total_amount']
+    search_fields = ['user__username']
+    list_filter = ['status', 'currency']
+
+
+@admin.register(InvoiceSequence)
+class InvoiceSequenceAdmin(admin.ModelAdmin):
+    list_display = ['user', 'last_number']
+    search_fields = ['user__username']
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    search_fields = ['subject', 'recipient', 'invoice__invoice_number']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+    
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} email(s) queued for another attempt.')
+    retry_now.short_description = 'Retry selected emails now'
+
+@admin.register(PdfRenderJob)
+class PdfRenderJobAdmin(admin.ModelAdmin):
+    list_display = ['invoice', 'status', 'attempts', 'requested_at', 'started_at', 'finished_at']
+    search_fields = ['invoice__invoice_number', 'invoice__user__username']
+    list_filter = ['status', 'requested_at']
+    readonly_fields = ['requested_at', 'started_at', 'finished_at', 'last_error']
+    
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='running').update(status='pending', attempts=0, requested_at=timezone.now())
+        self.message_user(request, f'{updated} PDF render(s) queued for another attempt.')
+    retry_now.short_description = 'Render selected PDFs again'
+
+@admin.register(InvoiceExport)
+class InvoiceExportAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'requested_at', 'started_at', 'finished_at']
+    search_fields = ['user__username']
+    list_filter = ['status', 'requested_at']
+    readonly_fields = ['invoice_ids', 'file', 'requested_at', 'started_at', 'finished_at', 'last_error']
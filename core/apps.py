@@ -13,9 +13,20 @@ class CoreConfig(AppConfig):
     def ready(self):
         """
         This method is called when Django starts.
-        We use it to start our scheduler.
+        We use it to connect our signals and start our scheduler.
         """
+        import multiprocessing
         import sys
+        from django.conf import settings
+        from . import signals  # noqa: F401
+        
+        # Web processes leave the jobs to `manage.py run_scheduler` when autostart is off
+        if not settings.SCHEDULER_AUTOSTART:
+            return
+        
+        # PDF render pool workers are spawned with the parent's sys.argv but must never run jobs
+        if multiprocessing.parent_process() is not None:
+            return
         
         # Check if DATABASE_URL is set (required for scheduler to work)
         if not os.getenv('DATABASE_URL'):
@@ -0,0 +1,71 @@
+# core/cache.py
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+DASHBOARD_VERSION_KEY = 'dashboard:version:{user_id}'
+DASHBOARD_CONTEXT_KEY = 'dashboard:context:{user_id}'
+
+# A version bumped in one process's memory is never seen by the other workers,
+# so dashboards are not cached at all on these backends
+PROCESS_LOCAL_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def dashboard_cache_enabled():
+    """Dashboards are cached only when every worker shares the cache (Redis, database, ...)."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def _new_version():
+    # Versions start from the clock so a lost version key can never match an older cached context
+    return int(time.time() * 1000)
+
+
+def get_cached_dashboard(user_id):
+    """
+    Return (context, version) for the user's dashboard in one cache lookup.
+    context is None when nothing is cached for the current version, and
+    version is None as well when dashboard caching is disabled.
+    """
+    if not dashboard_cache_enabled():
+        return None, None
+
+    version_key = DASHBOARD_VERSION_KEY.format(user_id=user_id)
+    context_key = DASHBOARD_CONTEXT_KEY.format(user_id=user_id)
+    values = cache.get_many([version_key, context_key])
+
+    version = values.get(version_key)
+    if version is None:
+        cache.add(version_key, _new_version(), timeout=None)
+        version = cache.get(version_key)
+
+    payload = values.get(context_key)
+    if payload is not None and payload[0] == version:
+        return payload[1], version
+    return None, version
+
+
+def set_cached_dashboard(user_id, version, context, timeout=None):
+    """Store the dashboard context built while the user's version was `version`."""
+    if version is None:
+        return
+    if timeout is None:
+        timeout = settings.DASHBOARD_CACHE_TIMEOUT
+    cache.set(DASHBOARD_CONTEXT_KEY.format(user_id=user_id), (version, context), timeout)
+
+
+def bump_dashboard_version(user_id):
+    """Invalidate the user's cached dashboard once the current transaction commits."""
+    if not dashboard_cache_enabled():
+        return
+
+    def bump():
+        version_key = DASHBOARD_VERSION_KEY.format(user_id=user_id)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, _new_version(), timeout=None)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,180 @@
+# core/export.py
+import logging
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BusinessProfile, Invoice, InvoiceExport
+from .pdf import get_or_render_invoice_pdf
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 64 * 1024
+# Archives larger than this are spooled to disk on their way to storage
+EXPORT_SPOOL_SIZE = 20 * 1024 * 1024
+# An export still marked running after this long belonged to a worker that died; build it again
+EXPORT_RUNNING_TIMEOUT = timedelta(hours=1)
+
+
+def get_export_workers(workers=None):
+    return workers or getattr(settings, 'PDF_EXPORT_WORKERS', None) or os.cpu_count() or 1
+
+
+def create_render_pool(max_workers):
+    """
+    Process pool for rendering PDFs. Workers are spawned rather than forked,
+    so they start without this process's threads and database connections
+    and set Django up themselves; that keeps it safe to use from web workers
+    and the scheduler alike.
+    """
+    # Nothing should be left open mid-transaction while the workers start up
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def export_invoice_pdf(pk):
+    """
+    Render one invoice (usually in a worker process) and return its (archive name,
+    storage path). Goes through the PDF cache, so unchanged invoices are
+    not rendered again.
+    """
+    invoice = Invoice.objects.select_related('client').get(pk=pk)
+    profile = BusinessProfile.objects.get(user_id=invoice.user_id)
+    # Items are streamed from the database, so very long invoices do not exhaust the worker
+    path = get_or_render_invoice_pdf(invoice, profile)
+    return f'Invoice-{invoice.invoice_number}.pdf', path
+
+
+def render_invoice_pdfs(invoice_pks, workers=None):
+    """
+    Yield (archive name, storage path) for each invoice in order while a
+    pool of processes renders the rest; with workers=1 they are rendered
+    one after another in this process. Invoices that fail to render are
+    logged and skipped.
+    """
+    if not invoice_pks:
+        return
+
+    if workers == 1:
+        for pk in invoice_pks:
+            try:
+                result = export_invoice_pdf(pk)
+            except Exception as e:
+                logger.error(f'Error rendering PDF for invoice {pk}: {str(e)}')
+            else:
+                yield result
+        return
+
+    pool = create_render_pool(min(get_export_workers(workers), len(invoice_pks)))
+    try:
+        futures = [pool.submit(export_invoice_pdf, pk) for pk in invoice_pks]
+        for pk, future in zip(invoice_pks, futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                logger.error(f'Error rendering PDF for invoice {pk}: {str(e)}')
+    finally:
+        # Stops queued renders when the download is abandoned
+        pool.shutdown(cancel_futures=True)
+
+
+class ZipOutput:
+    """Write-only file object collecting what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def iter_invoice_pdf_zip(invoice_pks, workers=None):
+    """
+    Yield a ZIP archive of the invoices' PDFs in chunks, each PDF copied in
+    as soon as it is rendered, so memory use does not grow with the number
+    of invoices.
+    """
+    output = ZipOutput()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, path in render_invoice_pdfs(invoice_pks, workers):
+            with default_storage.open(path, 'rb') as source, archive.open(name, 'w') as target:
+                for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    yield from output.drain()
+            yield from output.drain()
+    yield from output.drain()
+
+
+def claim_invoice_export(now):
+    with transaction.atomic():
+        # A locked row is being built by another worker; leave it to it
+        export = (
+            InvoiceExport.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', started_at__lt=now - EXPORT_RUNNING_TIMEOUT))
+            .order_by('requested_at')
+            .first()
+        )
+        if export is not None:
+            export.status = 'running'
+            export.started_at = now
+            export.save(update_fields=['status', 'started_at'])
+    return export
+
+
+def run_invoice_exports(workers=None, now=None):
+    """
+    Build the oldest queued export, if any, and store its ZIP. Returns the
+    number of exports built (0 or 1).
+    """
+    export = claim_invoice_export(now or timezone.now())
+    if export is None:
+        return 0
+
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as buffer:
+            for chunk in iter_invoice_pdf_zip(export.invoice_ids, workers):
+                buffer.write(chunk)
+            buffer.seek(0)
+            export.file.save(f'invoices-{export.pk}-{timezone.localdate():%Y-%m-%d}.zip', File(buffer), save=False)
+    except Exception as e:
+        logger.error(f'Error building invoice export {export.pk}: {str(e)}')
+        InvoiceExport.objects.filter(pk=export.pk, started_at=export.started_at).update(
+            status='failed', last_error=str(e), finished_at=timezone.now(),
+        )
+        return 0
+
+    InvoiceExport.objects.filter(pk=export.pk, started_at=export.started_at).update(
+        status='done', file=export.file.name, last_error='', finished_at=timezone.now(),
+    )
+    return 1
+
+
+def delete_old_exports(max_age):
+    """Delete exports, and their ZIP files, requested more than max_age seconds ago."""
+    exports = InvoiceExport.objects.filter(requested_at__lt=timezone.now() - timedelta(seconds=max_age))
+    for export in exports.exclude(file=''):
+        export.file.delete(save=False)
+    return exports.delete()[0]
@@ -1,6 +1,11 @@
+from datetime import datetime, time, timedelta
 from django import forms
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from .logos import process_logo
 from .models import BusinessProfile, Client, Invoice, InvoiceItem
 
 class UserRegistrationForm(UserCreationForm):
@@ -51,6 +56,16 @@ class BusinessProfileForm(forms.ModelForm):
             'preferred_currency': forms.Select(attrs={'class': 'form-select'}),
         }
 
+    def save(self, commit=True):
+        profile = super().save(commit=False)
+        # Resize once here rather than on every PDF render and page view
+        if 'business_logo' in self.changed_data:
+            process_logo(profile)
+        if commit:
+            profile.save()
+            self.save_m2m()
+        return profile
+
 
 class ClientForm(forms.ModelForm):
     class Meta:
@@ -113,6 +128,50 @@ class InvoiceForm(forms.ModelForm):
             self.fields['client'].queryset = Client.objects.filter(user=user)
 
 
+class InvoiceFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        choices=[('', 'All statuses')] + Invoice.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    client = forms.ModelChoiceField(
+        queryset=Client.objects.none(),
+        required=False,
+        empty_label='All clients',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={
+        'class': 'form-control form-control-sm',
+        'type': 'date'
+    }))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={
+        'class': 'form-control form-control-sm',
+        'type': 'date'
+    }))
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user:
+            self.fields['client'].queryset = Client.objects.filter(user=user)
+
+    def filter_queryset(self, queryset, now=None):
+        """Apply the valid filters to an Invoice queryset."""
+        data = self.cleaned_data
+        if data.get('status'):
+            queryset = queryset.filter_effective_status(data['status'], now)
+        if data.get('client'):
+            queryset = queryset.filter(client=data['client'])
+        # Compare against day boundaries so the (user, invoice_date) index can be used
+        if data.get('date_from'):
+            start = timezone.make_aware(datetime.combine(data['date_from'], time.min))
+            queryset = queryset.filter(invoice_date__gte=start)
+        if data.get('date_to'):
+            end = timezone.make_aware(datetime.combine(data['date_to'] + timedelta(days=1), time.min))
+            queryset = queryset.filter(invoice_date__lt=end)
+        return queryset
+
+
 class InvoiceItemForm(forms.ModelForm):
     class Meta:
         model = InvoiceItem
@@ -137,12 +196,85 @@ class InvoiceItemForm(forms.ModelForm):
         }
 
 
+class ExistingItemField(forms.ModelChoiceField):
+    """
+    Hidden id field that resolves items from existing_items, a {pk: item}
+    dict loaded once for the whole formset, instead of running one query
+    per submitted item.
+    """
+
+    def __init__(self, existing_items, *args, **kwargs):
+        self.existing_items = existing_items
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            item = self.existing_items.get(int(value))
+        except (TypeError, ValueError):
+            item = None
+        if item is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value}
+            )
+        return item
+
+
+class BaseInvoiceItemFormSet(forms.BaseInlineFormSet):
+    """
+    Writes all line items of an invoice with at most one DELETE, one UPDATE
+    and one INSERT instead of a query per item.
+    """
+    item_fields = ['description', 'quantity', 'unit_price', 'line_total', 'order_position']
+
+    @cached_property
+    def existing_items(self):
+        """The invoice's current items by pk, from the formset's one queryset."""
+        return {item.pk: item for item in self.get_queryset()}
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        id_field = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = ExistingItemField(
+            self.existing_items, id_field.queryset, initial=id_field.initial, required=False, widget=id_field.widget
+        )
+
+    def get_items(self):
+        """Kept items in form order, with order_position filled in; InvoiceCalculator sets line_total."""
+        items = []
+        for item_form in self.forms:
+            if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE'):
+                item = item_form.save(commit=False)
+                item.order_position = len(items)
+                items.append(item)
+        return items
+
+    def save_items(self, invoice, items):
+        deleted_pks = [item_form.instance.pk for item_form in self.deleted_forms if item_form.instance.pk]
+        if deleted_pks:
+            InvoiceItem.objects.filter(invoice=invoice, pk__in=deleted_pks).delete()
+
+        for item in items:
+            item.invoice = invoice
+        existing = [item for item in items if item.pk]
+        if existing:
+            InvoiceItem.objects.bulk_update(existing, self.item_fields)
+        new = [item for item in items if not item.pk]
+        if new:
+            InvoiceItem.objects.bulk_create(new)
+        return items
+
+
 InvoiceItemFormSet = forms.inlineformset_factory(
     Invoice,
     InvoiceItem,
     form=InvoiceItemForm,
+    formset=BaseInvoiceItemFormSet,
     extra=1,
     can_delete=True,
     min_num=1,
-    validate_min=True
+    validate_min=True,
+    max_num=settings.INVOICE_MAX_ITEMS,
+    absolute_max=settings.INVOICE_MAX_ITEMS,
 )
\ No newline at end of file
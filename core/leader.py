@@ -0,0 +1,164 @@
+# core/leader.py
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; every process then leads on its own
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary 64-bit key shared by every process that may run the scheduler
+DEFAULT_LOCK_ID = 814_227_301
+DEFAULT_LOCK_FILE = os.path.join(tempfile.gettempdir(), 'invoice-scheduler.lock')
+DEFAULT_INTERVAL = 30
+
+
+class AdvisoryLock:
+    """
+    Session-level PostgreSQL advisory lock held on a dedicated connection.
+    The server releases it as soon as that connection goes away, so a dead
+    leader frees the lock without any cleanup.
+    """
+
+    def __init__(self, lock_id, alias=DEFAULT_DB_ALIAS):
+        self.lock_id = lock_id
+        self.alias = alias
+        self.connection = None
+
+    def acquire(self):
+        if self.connection is None:
+            self.connection = connections.create_connection(self.alias)
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [self.lock_id])
+                acquired = cursor.fetchone()[0]
+        except Exception:
+            self.close()
+            raise
+        if not acquired:
+            self.close()
+        return acquired
+
+    def is_held(self):
+        if self.connection is None:
+            return False
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            self.close()
+            return False
+
+    def release(self):
+        if self.connection is None:
+            return
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [self.lock_id])
+        except Exception:
+            pass
+        self.close()
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+
+class FileLock:
+    """
+    Exclusive flock on a local file, for databases without advisory locks.
+    Only processes on the same host take part in the election.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def acquire(self):
+        if fcntl is None:
+            return True
+        handle = open(self.path, 'a')
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self.handle = handle
+        return True
+
+    def is_held(self):
+        return fcntl is None or self.handle is not None
+
+    def release(self):
+        if self.handle is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+
+def get_leader_lock(alias=DEFAULT_DB_ALIAS):
+    """
+    Return the lock suited to the configured database.
+    """
+    if connections[alias].vendor == 'postgresql':
+        return AdvisoryLock(getattr(settings, 'SCHEDULER_LOCK_ID', DEFAULT_LOCK_ID), alias)
+    return FileLock(getattr(settings, 'SCHEDULER_LOCK_FILE', None) or DEFAULT_LOCK_FILE)
+
+
+class LeaderElection(threading.Thread):
+    """
+    Background thread that keeps trying to take the leader lock.
+
+    The process holding the lock calls on_elected once; when it notices the
+    lock is gone it calls on_deposed and goes back to campaigning, so one of
+    the remaining processes takes over within one interval.
+    """
+
+    def __init__(self, on_elected, on_deposed, lock=None, interval=None):
+        super().__init__(name='scheduler-leader-election', daemon=True)
+        self.on_elected = on_elected
+        self.on_deposed = on_deposed
+        self.lock = lock or get_leader_lock()
+        self.interval = interval or getattr(settings, 'SCHEDULER_LEADER_INTERVAL', DEFAULT_INTERVAL)
+        self.is_leader = False
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                if not self.is_leader:
+                    if self.lock.acquire():
+                        logger.info(f'Process {os.getpid()} elected scheduler leader')
+                        try:
+                            self.on_elected()
+                        except Exception:
+                            self.lock.release()
+                            raise
+                        self.is_leader = True
+                elif not self.lock.is_held():
+                    logger.warning(f'Process {os.getpid()} lost scheduler leadership')
+                    self.is_leader = False
+                    self.on_deposed()
+            except Exception as e:
+                logger.error(f'Error during scheduler leader election: {str(e)}')
+            self._stopped.wait(self.interval)
+
+        if self.is_leader:
+            self.is_leader = False
+            self.on_deposed()
+        self.lock.release()
+
+    def stop(self):
+        self._stopped.set()
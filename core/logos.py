@@ -0,0 +1,84 @@
+# core/logos.py
+import hashlib
+import logging
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from reportlab.lib.utils import ImageReader
+
+logger = logging.getLogger(__name__)
+
+# The PDF draws the logo within 150x80 points; three pixels per point keeps it sharp in print
+PDF_LOGO_SIZE = (450, 240)
+# Large enough for the 150px-high preview on the profile page
+THUMBNAIL_SIZE = (400, 200)
+LOGO_READER_CACHE_SIZE = 64
+
+
+def resize_logo(image, size):
+    """Return the logo scaled down to fit size as (content, extension)."""
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+
+    buffer = BytesIO()
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image.convert('RGBA').save(buffer, format='PNG', optimize=True)
+        extension = 'png'
+    else:
+        image.convert('RGB').save(buffer, format='JPEG', quality=85, optimize=True)
+        extension = 'jpg'
+    return ContentFile(buffer.getvalue()), extension
+
+
+def process_logo(profile):
+    """
+    Build the PDF and thumbnail copies of profile.business_logo and assign
+    them to logo_pdf and logo_thumbnail, removing the previous copies. The
+    copies are named after a hash of their content, so a new logo uploaded
+    under the same file name still gets new names. The files are written to
+    storage; saving the profile is left to the caller.
+    """
+    for field in (profile.logo_pdf, profile.logo_thumbnail):
+        if field:
+            field.delete(save=False)
+
+    if not profile.business_logo:
+        return
+
+    logo = profile.business_logo
+    logo.open('rb')
+    try:
+        with Image.open(logo) as image:
+            image = ImageOps.exif_transpose(image)
+            stem = os.path.splitext(os.path.basename(logo.name))[0]
+            for field, size in ((profile.logo_pdf, PDF_LOGO_SIZE), (profile.logo_thumbnail, THUMBNAIL_SIZE)):
+                content, extension = resize_logo(image, size)
+                digest = hashlib.sha256(content.read()).hexdigest()[:12]
+                content.seek(0)
+                field.save(f'{stem}-{digest}.{extension}', content, save=False)
+    finally:
+        # The upload itself is written after this, so hand it back rewound
+        logo.seek(0)
+
+
+@lru_cache(maxsize=LOGO_READER_CACHE_SIZE)
+def load_logo_reader(name):
+    """
+    Decoded logo for ReportLab, kept for the life of the process. PDF copies
+    are named after their content and uploads that reuse a stored name get a
+    suffix from the storage, so a replaced logo never hits a stale entry.
+    """
+    with default_storage.open(name, 'rb') as f:
+        return ImageReader(BytesIO(f.read()))
+
+
+def get_logo_reader(profile):
+    """ImageReader for the logo drawn on PDFs, or None if the profile has none."""
+    logo = profile.logo_pdf or profile.business_logo
+    if not logo:
+        return None
+    return load_logo_reader(logo.name)
@@ -0,0 +1,122 @@
+# core/management/commands/benchmark_invoice_queries.py
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.models import Client, Invoice, InvoiceItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway dataset and prints the query plans of the hot invoice queries '
+        'with and without the invoice indexes. Everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--invoices', type=int, default=50000, help='Number of invoices to seed')
+        parser.add_argument('--users', type=int, default=20, help='Number of users to spread them over')
+
+    def handle(self, *args, **options):
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(f'{connection.vendor} cannot roll back index changes; run this on PostgreSQL or SQLite')
+
+        with transaction.atomic():
+            user, client = self.seed(options['invoices'], options['users'])
+            queries = self.hot_queries(user, client)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('\n=== AFTER (with indexes) ==='))
+            after = self.explain_all(queries, 'after')
+
+            self.drop_indexes()
+            self.stdout.write(self.style.MIGRATE_HEADING('\n=== BEFORE (without indexes) ==='))
+            before = self.explain_all(queries, 'before')
+
+            self.stdout.write(self.style.MIGRATE_HEADING('\n=== SUMMARY ==='))
+            for name in queries:
+                self.stdout.write(f'{name:<28} before {before[name]:8.2f} ms   after {after[name]:8.2f} ms')
+
+            transaction.set_rollback(True)
+
+    def seed(self, invoice_count, user_count):
+        self.stdout.write(f'Seeding {invoice_count} invoices for {user_count} users...')
+        now = timezone.now()
+        suffix = int(time.time())
+        users = User.objects.bulk_create([
+            User(username=f'benchmark-{suffix}-{i}') for i in range(user_count)
+        ])
+        clients = Client.objects.bulk_create([
+            Client(user=user, name=f'Client {i}', email='client@example.com', phone='0',
+                   street_address='-', city='-', state_province='-', zip_postal_code='-', country='-')
+            for i, user in enumerate(users)
+        ])
+
+        statuses = ['draft', 'sent', 'sent', 'paid', 'paid', 'paid', 'overdue']
+        batch = []
+        for i in range(invoice_count):
+            owner = i % user_count
+            batch.append(Invoice(
+                user=users[owner],
+                client=clients[owner],
+                invoice_number=f'INV-{i:07d}',
+                due_date=now + timedelta(days=(i % 120) - 60),
+                status=statuses[i % len(statuses)],
+                currency='USD' if i % 3 else 'EUR',
+                subtotal=Decimal('100.00'),
+                total_amount=Decimal('100.00'),
+            ))
+            if len(batch) == 5000:
+                Invoice.objects.bulk_create(batch)
+                batch = []
+        Invoice.objects.bulk_create(batch)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Invoice._meta.db_table}')
+        return users[0], clients[0]
+
+    def hot_queries(self, user, client):
+        now = timezone.now()
+        invoices = Invoice.objects.filter(user=user)
+        return {
+            'status_counts': invoices.values('status').annotate(count=Count('pk')).order_by(),
+            'newly_overdue_totals': invoices.filter(status='sent', due_date__lt=now).values('currency').annotate(
+                amount=Sum('total_amount')).order_by(),
+            'invoice_list_page': invoices.filter(
+                Q(status='overdue') | Q(status='sent', due_date__lt=now)
+            ).order_by('-created_timestamp', '-pk')[:26],
+            'recent_invoices': invoices.order_by('-created_timestamp', '-pk')[:5],
+            'overdue_sweep': Invoice.objects.filter(status='sent', due_date__lt=now).order_by().values('pk')[:1000],
+            'client_invoices': Invoice.objects.filter(client=client).order_by('-created_timestamp'),
+        }
+
+    def explain_all(self, queries, phase):
+        timings = {}
+        explain_options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+        prefix = connection.ops.explain_query_prefix(**explain_options)
+        for name, queryset in queries.items():
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                # The phase comment keeps SQLite from reusing a plan prepared before the indexes changed
+                cursor.execute(f'{prefix} {sql} -- {phase}', params)
+                plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+            self.stdout.write(self.style.SQL_KEYWORD(f'\n-- {name}'))
+            self.stdout.write(plan)
+
+            start = time.perf_counter()
+            for _ in range(5):
+                list(queryset.all())
+            timings[name] = (time.perf_counter() - start) * 1000 / 5
+        return timings
+
+    def drop_indexes(self):
+        schema_editor = connection.SchemaEditorClass(connection)
+        with connection.cursor() as cursor:
+            for model in (Invoice, InvoiceItem):
+                for index in model._meta.indexes:
+                    cursor.execute(str(index.remove_sql(model, schema_editor)))
@@ -0,0 +1,124 @@
+# core/management/commands/benchmark_pdf.py
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.calculator import InvoiceCalculator
+from core.models import BusinessProfile, Client, Invoice, InvoiceItem
+from core.pdf import InvoiceRenderer, build_styles
+
+
+class Command(BaseCommand):
+    help = (
+        'Times invoice PDF renders with the shared styles against the cost '
+        'of building them per render, or with --scaling, reports render time and peak memory '
+        'as the number of line items grows. Uses an in-memory invoice; nothing touches the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=50, help='Number of renders to time')
+        parser.add_argument('--items', type=int, default=20, help='Line items on the sample invoice')
+        parser.add_argument(
+            '--scaling',
+            action='store_true',
+            help='Render once at each of --item-counts and report time and peak traced memory',
+        )
+        parser.add_argument(
+            '--item-counts',
+            default='10,1000,10000',
+            help='Comma-separated line item counts for --scaling',
+        )
+
+    def handle(self, *args, **options):
+        if options['renders'] < 1:
+            raise CommandError('--renders must be at least 1')
+        if options['scaling']:
+            return self.report_scaling(options['item_counts'])
+
+        invoice, profile = self.sample_invoice(options['items'])
+        items = list(self.sample_items(options['items']))
+        renders = options['renders']
+
+        # Warm up imports and font metrics so the first timed render is not an outlier
+        InvoiceRenderer(invoice, profile, items).render(BytesIO())
+
+        start = time.perf_counter()
+        for _ in range(renders):
+            build_styles()
+        setup_ms = (time.perf_counter() - start) * 1000 / renders
+
+        start = time.perf_counter()
+        for _ in range(renders):
+            InvoiceRenderer(invoice, profile, items).render(BytesIO())
+        render_ms = (time.perf_counter() - start) * 1000 / renders
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{renders} renders, {len(items)} line item(s)'))
+        self.stdout.write(f'Styles built per render                 {setup_ms:8.2f} ms')
+        self.stdout.write(f'Render with shared styles               {render_ms:8.2f} ms')
+        self.stdout.write(f'Render building styles each time        {render_ms + setup_ms:8.2f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'Shared styles save {setup_ms:.2f} ms per render ({setup_ms / (render_ms + setup_ms):.0%})'
+        ))
+
+    def report_scaling(self, item_counts):
+        try:
+            item_counts = [int(count) for count in item_counts.split(',')]
+        except ValueError:
+            raise CommandError('--item-counts must be comma-separated integers')
+
+        # Warm up imports and font metrics so the first timed render is not an outlier
+        invoice, profile = self.sample_invoice(10)
+        InvoiceRenderer(invoice, profile, self.sample_items(10)).render(BytesIO())
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Line items      Render time   Peak memory     PDF size'))
+        for item_count in item_counts:
+            # Items are handed over as a generator, the way .iterator() streams them from the database
+            invoice, profile = self.sample_invoice(item_count)
+            output = BytesIO()
+            start = time.perf_counter()
+            InvoiceRenderer(invoice, profile, self.sample_items(item_count)).render(output)
+            render_ms = (time.perf_counter() - start) * 1000
+
+            # Traced separately: tracemalloc slows the render down several times over
+            tracemalloc.start()
+            try:
+                InvoiceRenderer(invoice, profile, self.sample_items(item_count)).render(BytesIO())
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            self.stdout.write(
+                f'{item_count:>10}   {render_ms:>10.0f} ms   {peak / 2**20:>8.1f} MiB   '
+                f'{len(output.getvalue()) / 1024:>7.0f} KiB'
+            )
+
+    def sample_items(self, item_count):
+        for i in range(item_count):
+            item = InvoiceItem(description=f'Line item {i + 1}', quantity=Decimal(i % 5 + 1), unit_price=Decimal('19.99'))
+            item.line_total = InvoiceCalculator.line_total(item.quantity, item.unit_price)
+            yield item
+
+    def sample_invoice(self, item_count):
+        profile = BusinessProfile(
+            business_name='Benchmark Ltd', business_email='billing@example.com', phone_number='5550100',
+            street_address='1 Main St', city='Springfield', state_province='IL',
+            zip_postal_code='62701', country='USA',
+        )
+        client = Client(
+            name='Example Client', email='client@example.com', phone='5550101', street_address='2 Side St',
+            city='Springfield', state_province='IL', zip_postal_code='62702', country='USA',
+        )
+        now = timezone.now()
+        invoice = Invoice(
+            client=client, invoice_number='INV-00001', invoice_date=now, due_date=now + timedelta(days=30),
+            status='sent', currency='USD', tax_rate=Decimal('8.25'), discount_amount=Decimal('5.00'),
+            notes='Payment due within 30 days.',
+        )
+        invoice.subtotal = sum((item.line_total for item in self.sample_items(item_count)), Decimal('0'))
+        InvoiceCalculator.for_invoice(invoice).apply(invoice)
+        return invoice, profile
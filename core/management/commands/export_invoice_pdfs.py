@@ -0,0 +1,65 @@
+# core/management/commands/export_invoice_pdfs.py
+import time
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import get_export_workers, iter_invoice_pdf_zip
+from core.forms import InvoiceFilterForm
+from core.models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Writes a ZIP of a user's invoice PDFs, selected with the invoice list filters and rendered in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Owner of the invoices')
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--status', help='Only invoices with this (effective) status')
+        parser.add_argument('--client', type=int, help='Only invoices of this client id')
+        parser.add_argument('--date-from', help='Only invoices dated on or after this day (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Only invoices dated on or before this day (YYYY-MM-DD)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of rendering processes (defaults to PDF_EXPORT_WORKERS, or one per CPU core)',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["username"]}" does not exist')
+
+        filter_form = InvoiceFilterForm({
+            'status': options['status'] or '',
+            'client': options['client'] or '',
+            'date_from': options['date_from'] or '',
+            'date_to': options['date_to'] or '',
+        }, user=user)
+        if not filter_form.is_valid():
+            errors = '; '.join(f'{name}: {" ".join(messages)}' for name, messages in filter_form.errors.items())
+            raise CommandError(f'Invalid filters: {errors}')
+
+        invoices = filter_form.filter_queryset(Invoice.objects.filter(user=user))
+        invoice_pks = list(invoices.order_by('invoice_date', 'pk').values_list('pk', flat=True))
+        if not invoice_pks:
+            raise CommandError('No invoices match these filters')
+
+        workers = min(get_export_workers(options['workers']), len(invoice_pks))
+        start = time.perf_counter()
+        with open(options['output'], 'wb') as output:
+            for chunk in iter_invoice_pdf_zip(invoice_pks, workers):
+                output.write(chunk)
+        with zipfile.ZipFile(options['output']) as archive:
+            exported_count = len(archive.namelist())
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully exported {exported_count} of {len(invoice_pks)} invoice(s) to {options["output"]} '
+                f'with {workers} process(es) in {time.perf_counter() - start:.1f}s'
+            )
+        )
@@ -0,0 +1,38 @@
+# core/management/commands/process_logos.py
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from core.logos import process_logo
+from core.models import BusinessProfile
+
+
+class Command(BaseCommand):
+    help = 'Builds the PDF and thumbnail copies of business logos uploaded before they were generated on save'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild the copies of every logo, not only the missing ones',
+        )
+
+    def handle(self, *args, **options):
+        profiles = BusinessProfile.objects.exclude(business_logo='').exclude(business_logo__isnull=True)
+        if not options['all']:
+            profiles = profiles.filter(Q(logo_pdf__isnull=True) | Q(logo_pdf=''))
+
+        processed_count = 0
+        for profile in profiles.iterator():
+            try:
+                process_logo(profile)
+            except (OSError, ValueError) as e:
+                self.stderr.write(f'Skipping logo of {profile}: {str(e)}')
+                continue
+            # update_fields leaves last_login alone
+            profile.save(update_fields=['logo_pdf', 'logo_thumbnail'])
+            processed_count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully processed {processed_count} logo(s)'
+            )
+        )
@@ -0,0 +1,29 @@
+# core/management/commands/rebuild_invoice_stats.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from core.models import UserInvoiceStats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-user invoice statistics from the invoices table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Only rebuild the stats of this username (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+
+        row_count = UserInvoiceStats.rebuild(users)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully rebuilt {row_count} invoice stats row(s)'
+            )
+        )
@@ -0,0 +1,34 @@
+# core/management/commands/recalculate_invoice_totals.py
+from django.core.management.base import BaseCommand
+from core.models import Invoice
+
+
+class Command(BaseCommand):
+    help = 'Recomputes line totals, tax and totals of invoices from their items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Only recalculate the invoices of this username (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of invoices loaded and written per batch',
+        )
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.all()
+        if options['usernames']:
+            invoices = invoices.filter(user__username__in=options['usernames'])
+
+        updated_count = invoices.recalculate_totals(batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully recalculated {updated_count} invoice(s)'
+            )
+        )
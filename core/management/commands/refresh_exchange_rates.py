@@ -0,0 +1,21 @@
+# core/management/commands/refresh_exchange_rates.py
+from django.core.management.base import BaseCommand
+from core.utils import refresh_exchange_rates
+
+
+class Command(BaseCommand):
+    help = 'Fetches exchange rates for all supported currencies and stores a snapshot'
+
+    def handle(self, *args, **kwargs):
+        stored_count = refresh_exchange_rates()
+
+        if stored_count == 0:
+            self.stdout.write(
+                self.style.WARNING('No exchange rates could be fetched')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Successfully stored {stored_count} exchange rate(s)'
+                )
+            )
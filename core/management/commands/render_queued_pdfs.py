@@ -0,0 +1,34 @@
+# core/management/commands/render_queued_pdfs.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.pdf_jobs import run_pdf_render_jobs
+
+
+class Command(BaseCommand):
+    help = 'Renders one batch of queued invoice PDFs across a pool of processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.PDF_RENDER_BATCH_SIZE,
+            help='Number of jobs claimed and rendered',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of rendering processes (defaults to PDF_EXPORT_WORKERS, or one per CPU core)',
+        )
+
+    def handle(self, *args, **options):
+        rendered_count, failed_count = run_pdf_render_jobs(
+            batch_size=options['batch_size'], workers=options['workers'],
+        )
+
+        if failed_count:
+            self.stdout.write(
+                self.style.WARNING(f'{failed_count} PDF(s) failed permanently')
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rendered {rendered_count} PDF(s)')
+        )
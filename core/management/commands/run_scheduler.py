@@ -0,0 +1,68 @@
+# core/management/commands/run_scheduler.py
+import signal
+import threading
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.leader import get_leader_lock
+from core.scheduler import add_jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs the background job scheduler in the foreground until it receives SIGTERM or SIGINT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=getattr(settings, 'SCHEDULER_THREADS', 4),
+            help='Number of worker threads available to run jobs',
+        )
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1:
+            raise CommandError('--threads must be at least 1')
+
+        stopping = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write(f'Received {signal.Signals(signum).name}, shutting down...')
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        # Wait for any other scheduler (a previous deploy, or a web worker) to let go
+        lock = get_leader_lock()
+        interval = getattr(settings, 'SCHEDULER_LEADER_INTERVAL', 30)
+        while not lock.acquire():
+            self.stdout.write('Another process holds the scheduler lock, waiting...')
+            if stopping.wait(interval):
+                return
+
+        scheduler = add_jobs(BackgroundScheduler(
+            executors={'default': ThreadPoolExecutor(options['threads'])},
+            job_defaults={'coalesce': True},
+        ))
+        lost_lock = False
+        try:
+            scheduler.start()
+            self.stdout.write(self.style.SUCCESS(f'Scheduler started with {options["threads"]} thread(s)'))
+
+            # The main thread owns the lock and keeps checking it until asked to stop
+            while not stopping.wait(interval):
+                if not lock.is_held():
+                    lost_lock = True
+                    break
+
+            self.stdout.write('Waiting for running jobs to finish...')
+            scheduler.shutdown(wait=True)
+        finally:
+            lock.release()
+
+        if lost_lock:
+            raise CommandError('Lost the scheduler lock; exiting so the process can be restarted')
+        self.stdout.write(self.style.SUCCESS('Scheduler shut down successfully'))
@@ -0,0 +1,27 @@
+# core/management/commands/send_queued_emails.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.outbox import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Sends pending emails from the outbox over a single mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Number of emails locked and sent per batch',
+        )
+
+    def handle(self, *args, **options):
+        sent_count, failed_count = send_queued_emails(batch_size=options['batch_size'])
+
+        if failed_count:
+            self.stdout.write(
+                self.style.WARNING(f'{failed_count} email(s) failed permanently')
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully sent {sent_count} email(s)')
+        )
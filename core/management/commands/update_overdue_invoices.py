@@ -1,31 +1,27 @@
 # core/management/commands/update_overdue_invoices.py
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from core.models import Invoice
+from core.models import Invoice, OVERDUE_CHUNK_SIZE
 
 
 class Command(BaseCommand):
     help = 'Updates invoice status to overdue for sent invoices past due date'
 
-    def handle(self, *args, **kwargs):
-        now = timezone.now()
-        
-        # Find all 'sent' invoices that are past due date
-        overdue_invoices = Invoice.objects.filter(
-            status='sent',
-            due_date__lt=now
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=OVERDUE_CHUNK_SIZE,
+            help='Number of invoices updated per statement',
+        )
+
+    def handle(self, *args, **options):
+        def report_chunk(rows):
+            self.stdout.write(f'Updated {len(rows)} invoice(s) to overdue')
+
+        updated_count = Invoice.objects.mark_overdue(
+            chunk_size=options['chunk_size'],
+            on_chunk=report_chunk,
         )
-        
-        updated_count = 0
-        for invoice in overdue_invoices:
-            invoice.status = 'overdue'
-            invoice.save(update_fields=['status', 'last_modified_timestamp'])
-            updated_count += 1
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Updated invoice {invoice.invoice_number} to overdue'
-                )
-            )
         
         if updated_count == 0:
             self.stdout.write(
@@ -36,4 +32,4 @@ class Command(BaseCommand):
                 self.style.SUCCESS(
                     f'Successfully updated {updated_count} invoice(s) to overdue'
                 )
-            )
\ No newline at end of file
+            )
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_invoice_invoice_number_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRateTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_currency', models.CharField(max_length=3, unique=True)),
+                ('rates', models.JSONField(default=dict)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Exchange Rate Table',
+                'verbose_name_plural': 'Exchange Rate Tables',
+            },
+        ),
+    ]
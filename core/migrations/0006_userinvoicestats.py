@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_invoice_stats(apps, schema_editor):
+    Invoice = apps.get_model('core', 'Invoice')
+    UserInvoiceStats = apps.get_model('core', 'UserInvoiceStats')
+    rows = Invoice.objects.order_by().values('user_id', 'status', 'currency').annotate(
+        count=models.Count('id'),
+        amount=models.Sum('total_amount'),
+    )
+    UserInvoiceStats.objects.bulk_create([
+        UserInvoiceStats(user_id=row['user_id'], status=row['status'], currency=row['currency'],
+                         invoice_count=row['count'], total_amount=row['amount'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0005_exchangerate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserInvoiceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('sent', 'Sent'), ('paid', 'Paid'), ('overdue', 'Overdue')], max_length=10)),
+                ('currency', models.CharField(choices=[('USD', 'US Dollar ($)'), ('EUR', 'Euro (€)'), ('GBP', 'British Pound (£)'), ('JPY', 'Japanese Yen (¥)'), ('AUD', 'Australian Dollar (A$)'), ('CAD', 'Canadian Dollar (C$)'), ('CHF', 'Swiss Franc (Fr)'), ('CNY', 'Chinese Yuan (¥)'), ('INR', 'Indian Rupee (₹)'), ('PHP', 'Philippine Peso (₱)')], max_length=3)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Invoice Stats',
+                'verbose_name_plural': 'User Invoice Stats',
+                'unique_together': {('user', 'status', 'currency')},
+            },
+        ),
+        migrations.RunPython(backfill_invoice_stats, migrations.RunPython.noop),
+    ]
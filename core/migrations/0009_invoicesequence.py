@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_invoice_sequences(apps, schema_editor):
+    Invoice = apps.get_model('core', 'Invoice')
+    InvoiceSequence = apps.get_model('core', 'InvoiceSequence')
+    last_numbers = {}
+    numbers = Invoice.objects.filter(invoice_number__startswith='INV-').values_list('user_id', 'invoice_number')
+    for user_id, invoice_number in numbers.iterator():
+        try:
+            number = int(invoice_number.split('-')[1])
+        except (ValueError, IndexError):
+            continue
+        last_numbers[user_id] = max(number, last_numbers.get(user_id, 0))
+    InvoiceSequence.objects.bulk_create([
+        InvoiceSequence(user_id=user_id, last_number=last_number)
+        for user_id, last_number in last_numbers.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0008_invoice_sent_modified_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_number', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_sequence', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Invoice Sequence',
+                'verbose_name_plural': 'Invoice Sequences',
+            },
+        ),
+        migrations.RunPython(backfill_invoice_sequences, migrations.RunPython.noop),
+    ]
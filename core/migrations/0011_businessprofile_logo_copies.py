@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessprofile',
+            name='logo_pdf',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='logos/pdf/'),
+        ),
+        migrations.AddField(
+            model_name='businessprofile',
+            name='logo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='logos/thumbnails/'),
+        ),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Case, CharField, Count, F, Q, Sum, Value, When
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from decimal import Decimal
 
+from .cache import bump_dashboard_version
+from .calculator import InvoiceCalculator
+
+# Invoices moved to overdue per UPDATE statement by InvoiceQuerySet.mark_overdue
+OVERDUE_CHUNK_SIZE = 1000
+
 # Currency choices
 CURRENCY_CHOICES = [
     ('USD', 'US Dollar ($)'),
@@ -30,10 +37,18 @@ COUNTRY_CODES = [
     ('+49', 'Germany (+49)'),
 ]
 
+
+def format_invoice_number(number):
+    return f"INV-{number:05d}"
+
+
 class BusinessProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='business_profile')
     business_name = models.CharField(max_length=255)
     business_logo = models.ImageField(upload_to='logos/', blank=True, null=True)
+    # Downscaled copies of business_logo, rebuilt by BusinessProfileForm whenever the logo changes
+    logo_pdf = models.ImageField(upload_to='logos/pdf/', blank=True, null=True, editable=False)
+    logo_thumbnail = models.ImageField(upload_to='logos/thumbnails/', blank=True, null=True, editable=False)
     business_email = models.EmailField()
     phone_country_code = models.CharField(max_length=5, choices=COUNTRY_CODES, default='+1')
     phone_number = models.CharField(max_length=20)
@@ -49,6 +64,10 @@ class BusinessProfile(models.Model):
     def __str__(self):
         return f"{self.business_name} - {self.user.username}"
 
+    def get_logo_url(self):
+        logo = self.logo_thumbnail or self.business_logo
+        return logo.url if logo else ''
+
     class Meta:
         verbose_name = "Business Profile"
         verbose_name_plural = "Business Profiles"
@@ -78,6 +97,129 @@ class Client(models.Model):
         verbose_name_plural = "Clients"
 
 
+class InvoiceQuerySet(models.QuerySet):
+    def with_effective_status(self, now=None):
+        """
+        Annotate effective_status: 'overdue' for sent invoices past their due date,
+        otherwise the stored status. Derived in SQL so reads never have to write.
+        """
+        now = now or timezone.now()
+        return self.annotate(effective_status=Case(
+            When(status='sent', due_date__lt=now, then=Value('overdue')),
+            default=F('status'),
+            output_field=CharField(),
+        ))
+
+    def filter_effective_status(self, status, now=None):
+        """Filter on effective status using plain (indexable) status/due_date predicates."""
+        now = now or timezone.now()
+        if status == 'overdue':
+            return self.filter(Q(status='overdue') | Q(status='sent', due_date__lt=now))
+        if status == 'sent':
+            return self.filter(status='sent', due_date__gte=now)
+        return self.filter(status=status)
+
+    def set_status(self, status):
+        """
+        Bulk status transition that keeps UserInvoiceStats in step.
+        Returns the number of invoices updated.
+        """
+        with transaction.atomic():
+            changing = self.exclude(status=status)
+            for user_id in UserInvoiceStats.record_status_change(changing, status):
+                bump_dashboard_version(user_id)
+            return changing.update(status=status, last_modified_timestamp=timezone.now())
+
+    def recalculate_totals(self, batch_size=500):
+        """
+        Recompute line totals and invoice amounts from the stored items with
+        InvoiceCalculator, one batch of invoices at a time, writing only the
+        rows that changed. Returns the number of invoices updated.
+        """
+        updated_count = 0
+        invoices = self.order_by('pk').prefetch_related('items').iterator(chunk_size=batch_size)
+        batch = []
+        for invoice in invoices:
+            batch.append(invoice)
+            if len(batch) == batch_size:
+                updated_count += self._save_recalculated(batch)
+                batch = []
+        if batch:
+            updated_count += self._save_recalculated(batch)
+        return updated_count
+
+    def _save_recalculated(self, invoices):
+        now = timezone.now()
+        changed_invoices = []
+        changed_items = []
+        for invoice in invoices:
+            items = list(invoice.items.all())
+            old_line_totals = [item.line_total for item in items]
+            if InvoiceCalculator.for_invoice(invoice).apply(invoice, items):
+                invoice.last_modified_timestamp = now
+                changed_invoices.append(invoice)
+                changed_items.extend(
+                    item for item, old in zip(items, old_line_totals) if item.line_total != old
+                )
+
+        with transaction.atomic():
+            InvoiceItem.objects.bulk_update(changed_items, ['line_total'])
+            self.model.objects.bulk_update(changed_invoices, [
+                'subtotal', 'tax_amount', 'discount_amount', 'total_amount', 'last_modified_timestamp',
+            ])
+            for invoice in changed_invoices:
+                new_key = invoice.get_stats_key()
+                UserInvoiceStats.record_invoice_change(invoice._stats_snapshot, new_key)
+                invoice._stats_snapshot = new_key
+            for user_id in {invoice.user_id for invoice in changed_invoices}:
+                bump_dashboard_version(user_id)
+        return len(changed_invoices)
+
+    def mark_overdue(self, now=None, chunk_size=OVERDUE_CHUNK_SIZE, on_chunk=None):
+        """
+        Move sent invoices past their due date to 'overdue' with chunked, set-based UPDATEs.
+        Stats and dashboard versions are updated once per chunk. on_chunk, if given,
+        receives the (id, user_id, currency, total_amount) rows of every chunk so
+        notifications can be driven in batch. Returns the number of invoices updated.
+        """
+        now = now or timezone.now()
+        table = self.model._meta.db_table
+        updated_count = 0
+
+        while True:
+            with transaction.atomic():
+                candidates = self.filter(status='sent', due_date__lt=now).order_by()
+
+                if connection.vendor == 'postgresql':
+                    # One statement per chunk: the UPDATE reports the rows it changed via RETURNING
+                    subquery = candidates.select_for_update(skip_locked=True).values('pk')[:chunk_size]
+                    sub_sql, sub_params = subquery.query.sql_with_params()
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            f'UPDATE {table} SET status = %s, last_modified_timestamp = %s '
+                            f'WHERE id IN ({sub_sql}) AND status = %s '
+                            f'RETURNING id, user_id, currency, total_amount',
+                            ['overdue', now, *sub_params, 'sent'],
+                        )
+                        rows = cursor.fetchall()
+                else:
+                    rows = list(candidates.select_for_update().values_list(
+                        'pk', 'user_id', 'currency', 'total_amount'
+                    )[:chunk_size])
+                    self.model.objects.filter(pk__in=[row[0] for row in rows], status='sent').update(
+                        status='overdue', last_modified_timestamp=now
+                    )
+
+                for user_id in UserInvoiceStats.record_transitions(rows, 'sent', 'overdue'):
+                    bump_dashboard_version(user_id)
+                if on_chunk is not None and rows:
+                    on_chunk(rows)
+
+            updated_count += len(rows)
+            if len(rows) < chunk_size:
+                return updated_count
+
+
 class Invoice(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -106,27 +248,36 @@ class Invoice(models.Model):
     created_timestamp = models.DateTimeField(auto_now_add=True)
     last_modified_timestamp = models.DateTimeField(auto_now=True)
 
+    objects = InvoiceQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.invoice_number} - {self.client.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this invoice contributes to UserInvoiceStats so saves can apply a delta
+        if STATS_FIELDS <= instance.__dict__.keys():
+            instance._stats_snapshot = instance.get_stats_key()
+        return instance
+
+    def get_stats_key(self):
+        return (self.user_id, self.status, self.currency, self.total_amount)
+
     def save(self, *args, **kwargs):
-        if not self.invoice_number:
-            last_invoice = Invoice.objects.filter(user=self.user).order_by('-id').first()
-            if last_invoice and last_invoice.invoice_number.startswith('INV-'):
-                try:
-                    last_number = int(last_invoice.invoice_number.split('-')[1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            self.invoice_number = f"INV-{new_number:05d}"
-        
-        # Calculate totals
-        self.tax_amount = (self.subtotal * self.tax_rate) / 100
-        self.total_amount = self.subtotal + self.tax_amount - self.discount_amount
-        
-        super().save(*args, **kwargs)
+        # Keep the number allocation and the UserInvoiceStats update from the post_save signal in the same transaction
+        with transaction.atomic():
+            if not self.invoice_number:
+                self.invoice_number = format_invoice_number(InvoiceSequence.allocate(self.user_id)[0])
+
+            # Calculate totals
+            InvoiceCalculator.for_invoice(self).apply(self)
+
+            super().save(*args, **kwargs)
+
+    def get_reference_time(self):
+        """Views rendering many invoices set as_of once so rows don't each read the clock."""
+        return self.__dict__.get('as_of') or timezone.now()
 
     def is_overdue(self):
         """
@@ -135,7 +286,7 @@ class Invoice(models.Model):
         - Sent invoices become overdue after due date passes
         - Paid invoices are never overdue
         """
-        now = timezone.now()
+        now = self.get_reference_time()
         
         # Only 'sent' invoices can be overdue
         if self.status == 'sent' and self.due_date < now:
@@ -147,14 +298,31 @@ class Invoice(models.Model):
         Check if a draft invoice's due date has passed.
         This is different from overdue - drafts just expire, not overdue.
         """
-        now = timezone.now()
+        now = self.get_reference_time()
         if self.status == 'draft' and self.due_date < now:
             return True
         return False
     
+    @property
+    def effective_status(self):
+        """
+        Status including the overdue transition, even before the scheduled job persists it.
+        Uses the with_effective_status() annotation when the invoice was loaded with it.
+        """
+        if '_effective_status' in self.__dict__:
+            return self.__dict__['_effective_status']
+        return 'overdue' if self.is_overdue() else self.status
+
+    @effective_status.setter
+    def effective_status(self, value):
+        self.__dict__['_effective_status'] = value
+
+    def get_effective_status_display(self):
+        return dict(self.STATUS_CHOICES).get(self.effective_status, self.effective_status)
+
     def days_until_due(self):
         """Calculate days until due date (negative if overdue)"""
-        now = timezone.now()
+        now = self.get_reference_time()
         delta = self.due_date - now
         return delta.days
     
@@ -174,6 +342,27 @@ class Invoice(models.Model):
         verbose_name = "Invoice"
         verbose_name_plural = "Invoices"
         unique_together = [['user', 'invoice_number']]  # Added this line
+        indexes = [
+            # Status counts for one user, and their sent invoices past due
+            models.Index(fields=['user', 'status', 'due_date'], name='invoice_user_status_idx'),
+            # Overdue sweep across all users
+            models.Index(fields=['status', 'due_date'], name='invoice_status_due_idx'),
+            # Recent invoices and keyset pagination of the invoice list
+            models.Index(fields=['user', '-created_timestamp', '-id'], name='invoice_user_created_idx'),
+            # Invoice list filtered by invoice date range
+            models.Index(fields=['user', 'invoice_date'], name='invoice_user_date_idx'),
+            # Invoices of a client, newest first
+            models.Index(fields=['client', '-created_timestamp'], name='invoice_client_created_idx'),
+            # Only sent invoices can become overdue (partial index on PostgreSQL/SQLite)
+            models.Index(fields=['due_date'], condition=Q(status='sent'), name='invoice_sent_due_idx'),
+            # Sent invoices saved since the overdue timer last looked
+            models.Index(
+                fields=['last_modified_timestamp'], condition=Q(status='sent'), name='invoice_sent_modified_idx'
+            ),
+        ]
+
+
+STATS_FIELDS = {'user_id', 'status', 'currency', 'total_amount'}
 
 
 class InvoiceItem(models.Model):
@@ -185,7 +374,7 @@ class InvoiceItem(models.Model):
     order_position = models.IntegerField(default=0)
 
     def save(self, *args, **kwargs):
-        self.line_total = self.quantity * self.unit_price
+        self.line_total = InvoiceCalculator.line_total(self.quantity, self.unit_price)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -195,6 +384,9 @@ class InvoiceItem(models.Model):
         ordering = ['order_position']
         verbose_name = "Invoice Item"
         verbose_name_plural = "Invoice Items"
+        indexes = [
+            models.Index(fields=['invoice', 'order_position'], name='invoiceitem_invoice_order_idx'),
+        ]
 
 
 class AdClick(models.Model):
@@ -221,4 +413,283 @@ class AdClick(models.Model):
     class Meta:
         ordering = ['-timestamp']
         verbose_name = "Ad Click"
-        verbose_name_plural = "Ad Clicks"
\ No newline at end of file
+        verbose_name_plural = "Ad Clicks"
+
+class ExchangeRateTable(models.Model):
+    base_currency = models.CharField(max_length=3, unique=True)
+    rates = models.JSONField(default=dict)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.base_currency} rates - {self.fetched_at}"
+
+    class Meta:
+        verbose_name = "Exchange Rate Table"
+        verbose_name_plural = "Exchange Rate Tables"
+
+
+class ExchangeRate(models.Model):
+    rate_date = models.DateField()
+    base_currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES)
+    quote_currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.base_currency}/{self.quote_currency} {self.rate} ({self.rate_date})"
+
+    class Meta:
+        ordering = ['-rate_date', 'base_currency', 'quote_currency']
+        verbose_name = "Exchange Rate"
+        verbose_name_plural = "Exchange Rates"
+        unique_together = [['rate_date', 'base_currency', 'quote_currency']]
+
+
+
+class UserInvoiceStats(models.Model):
+    """
+    Per-user invoice counts and sums by status and currency.
+    Kept current by the Invoice signals and InvoiceQuerySet.set_status;
+    run the rebuild_invoice_stats command to reconcile any drift.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='invoice_stats')
+    status = models.CharField(max_length=10, choices=Invoice.STATUS_CHOICES)
+    currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES)
+    invoice_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.user} - {self.status} - {self.currency}"
+
+    @classmethod
+    def apply_delta(cls, user_id, status, currency, count, amount):
+        updated = cls.objects.filter(user_id=user_id, status=status, currency=currency).update(
+            invoice_count=F('invoice_count') + count,
+            total_amount=F('total_amount') + amount,
+        )
+        # Only additions create rows - decrements for a missing row (e.g. a user being deleted) are dropped
+        if not updated and count > 0:
+            stats, created = cls.objects.get_or_create(
+                user_id=user_id, status=status, currency=currency,
+                defaults={'invoice_count': count, 'total_amount': amount}
+            )
+            if not created:
+                cls.apply_delta(user_id, status, currency, count, amount)
+
+    @classmethod
+    def record_invoice_change(cls, old_key, new_key):
+        """Move one invoice from its old (user_id, status, currency, total) bucket to the new one."""
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            cls.apply_delta(*old_key[:3], -1, -old_key[3])
+        if new_key is not None:
+            cls.apply_delta(*new_key[:3], 1, new_key[3])
+
+    @classmethod
+    def record_status_change(cls, queryset, status):
+        """
+        Apply the deltas for moving every invoice in queryset to status.
+        Returns the ids of the users whose stats changed.
+        """
+        rows = queryset.order_by().values('user_id', 'status', 'currency').annotate(
+            count=Count('id'),
+            amount=Sum('total_amount'),
+        )
+        user_ids = set()
+        for row in rows:
+            cls.apply_delta(row['user_id'], row['status'], row['currency'], -row['count'], -row['amount'])
+            cls.apply_delta(row['user_id'], status, row['currency'], row['count'], row['amount'])
+            user_ids.add(row['user_id'])
+        return user_ids
+
+    @classmethod
+    def record_transitions(cls, rows, from_status, to_status):
+        """
+        Apply the deltas for (id, user_id, currency, total_amount) rows that moved
+        from from_status to to_status. Returns the ids of the users whose stats changed.
+        """
+        buckets = {}
+        for _, user_id, currency, amount in rows:
+            count, total = buckets.get((user_id, currency), (0, Decimal('0')))
+            buckets[(user_id, currency)] = (count + 1, total + amount)
+
+        for (user_id, currency), (count, total) in buckets.items():
+            cls.apply_delta(user_id, from_status, currency, -count, -total)
+            cls.apply_delta(user_id, to_status, currency, count, total)
+        return {user_id for user_id, _ in buckets}
+
+    @classmethod
+    def rebuild(cls, users=None):
+        """Recompute the stats from the invoices table. Returns the number of rows written."""
+        invoices = Invoice.objects.all()
+        stats = cls.objects.all()
+        if users is not None:
+            invoices = invoices.filter(user__in=users)
+            stats = stats.filter(user__in=users)
+
+        rows = invoices.order_by().values('user_id', 'status', 'currency').annotate(
+            count=Count('id'),
+            amount=Sum('total_amount'),
+        )
+        with transaction.atomic():
+            stats.delete()
+            created = cls.objects.bulk_create([
+                cls(user_id=row['user_id'], status=row['status'], currency=row['currency'],
+                    invoice_count=row['count'], total_amount=row['amount'])
+                for row in rows
+            ])
+        return len(created)
+
+    class Meta:
+        verbose_name = "User Invoice Stats"
+        verbose_name_plural = "User Invoice Stats"
+        unique_together = [['user', 'status', 'currency']]
+
+
+class InvoiceSequence(models.Model):
+    """
+    Last invoice number handed out to each user.
+    Numbers are allocated with a single locked increment so concurrent
+    creates never read the same value.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='invoice_sequence')
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} - {self.last_number}"
+
+    @classmethod
+    def allocate(cls, user_id, count=1):
+        """
+        Reserve the next count numbers for a user and return them as a range.
+        The row stays locked until the surrounding transaction ends, so a
+        rolled back create gives its number back.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                table = cls._meta.db_table
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'INSERT INTO {table} (user_id, last_number) VALUES (%s, %s) '
+                        f'ON CONFLICT (user_id) DO UPDATE SET last_number = {table}.last_number + EXCLUDED.last_number '
+                        f'RETURNING last_number',
+                        [user_id, count],
+                    )
+                    last_number = cursor.fetchone()[0]
+            else:
+                if not cls.objects.filter(user_id=user_id).update(last_number=F('last_number') + count):
+                    cls.objects.get_or_create(user_id=user_id)
+                    cls.objects.filter(user_id=user_id).update(last_number=F('last_number') + count)
+                last_number = cls.objects.filter(user_id=user_id).values_list('last_number', flat=True).get()
+        return range(last_number - count + 1, last_number + 1)
+
+    class Meta:
+        verbose_name = "Invoice Sequence"
+        verbose_name_plural = "Invoice Sequences"
+
+
+class EmailOutbox(models.Model):
+    """
+    Email waiting to be delivered by the background sender (core.outbox).
+    Rows are written in the same transaction as the change that triggers
+    them, so an email goes out if and only if that change was committed.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='emails')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        verbose_name = "Email Outbox"
+        verbose_name_plural = "Email Outbox"
+        indexes = [
+            # The sender only ever looks for pending emails that are due
+            models.Index(fields=['next_attempt_at'], condition=Q(status='pending'), name='emailoutbox_pending_idx'),
+        ]
+
+
+class PdfRenderJob(models.Model):
+    """
+    Request to render an invoice PDF off the web request (core.pdf_jobs).
+    There is one row per invoice; asking again while it is queued or
+    running only moves requested_at, and a render that started before the
+    latest request is queued again when it finishes.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    invoice = models.OneToOneField(Invoice, on_delete=models.CASCADE, related_name='pdf_render_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    requested_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"PDF for {self.invoice_id} ({self.status})"
+
+    class Meta:
+        ordering = ['requested_at']
+        verbose_name = "PDF Render Job"
+        verbose_name_plural = "PDF Render Jobs"
+        indexes = [
+            # The worker only ever looks for queued jobs and runs that may have been abandoned
+            models.Index(fields=['requested_at'], condition=Q(status__in=['pending', 'running']), name='pdfrenderjob_queued_idx'),
+        ]
+
+
+class InvoiceExport(models.Model):
+    """
+    ZIP of invoice PDFs built by the scheduler's PDF worker (core.export)
+    for exports too large to stream within a web request. The selection is
+    fixed when the export is requested.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='invoice_exports')
+    invoice_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='invoice_exports/', blank=True)
+    requested_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Export of {len(self.invoice_ids)} invoice(s) for {self.user} ({self.status})"
+
+    class Meta:
+        ordering = ['requested_at']
+        verbose_name = "Invoice Export"
+        verbose_name_plural = "Invoice Exports"
+        indexes = [
+            models.Index(fields=['requested_at'], condition=Q(status__in=['pending', 'running']), name='invoiceexport_queued_idx'),
+        ]
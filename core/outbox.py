@@ -0,0 +1,128 @@
+# core/outbox.py
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+from .utils import get_currency_symbol
+
+logger = logging.getLogger(__name__)
+
+# Failed sends are retried after 1, 2, 4, 8... minutes, capped at MAX_BACKOFF
+BASE_BACKOFF = timedelta(minutes=1)
+MAX_BACKOFF = timedelta(hours=6)
+# Claimed emails are left alone by other senders for this long, then retried if never recorded
+SEND_LEASE = timedelta(minutes=10)
+
+
+def queue_invoice_email(invoice):
+    """
+    Queue the invoice email to the client. Call this inside the transaction
+    that saves the invoice; the background sender delivers it.
+    """
+    business_name = invoice.user.business_profile.business_name
+    subject = f'Invoice {invoice.invoice_number} from {business_name}'
+    message = f"""
+    Dear {invoice.client.name},
+
+    Please find attached your invoice {invoice.invoice_number}.
+
+    Invoice Details:
+    - Invoice Number: {invoice.invoice_number}
+    - Date: {invoice.invoice_date.strftime('%B %d, %Y')}
+    - Due Date: {invoice.due_date.strftime('%B %d, %Y')}
+    - Total Amount: {get_currency_symbol(invoice.currency)}{invoice.total_amount}
+
+    Thank you for your business!
+
+    Best regards,
+    {business_name}
+    """
+
+    return EmailOutbox.objects.create(
+        invoice=invoice,
+        subject=subject,
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient=invoice.client.email,
+    )
+
+
+def get_backoff(attempts):
+    return min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+
+
+def claim_queued_emails(batch_size, now):
+    """
+    Lease a batch of due pending emails to this sender and return them. The
+    lease pushes next_attempt_at past the batch, so other senders skip them
+    and, if this process dies mid-batch, they are picked up again after
+    SEND_LEASE. The transaction ends before anything is sent.
+    """
+    with transaction.atomic():
+        # Locked rows are being claimed by another process; leave them to it
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = now + SEND_LEASE
+        EmailOutbox.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def send_queued_emails(batch_size=None, max_attempts=None, now=None):
+    """
+    Deliver due pending emails in batches over a single mail connection.
+    Each batch is claimed in a short transaction and sent outside it, and
+    every result is written as soon as that message has been handed to the
+    mail server, so a crash resends at most the message in flight.
+    Failures are retried with exponential backoff and marked failed after
+    max_attempts. Returns a (sent, failed) tuple of counts.
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+    max_attempts = max_attempts or getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    now = now or timezone.now()
+    sent_count = 0
+    failed_count = 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        while True:
+            batch = claim_queued_emails(batch_size, now)
+            if not batch:
+                break
+
+            for email in batch:
+                try:
+                    # Opens the connection on first use and after a failure; otherwise a no-op
+                    connection.open()
+                    connection.send_messages([EmailMessage(
+                        email.subject, email.body, email.from_email, [email.recipient],
+                    )])
+                except Exception as e:
+                    logger.error(f'Error sending email {email.pk} to {email.recipient}: {str(e)}')
+                    # Start the next message on a fresh connection in case this one broke
+                    connection.close()
+                    if email.attempts >= max_attempts:
+                        failed_count += 1
+                        EmailOutbox.objects.filter(pk=email.pk).update(status='failed', last_error=str(e))
+                    else:
+                        EmailOutbox.objects.filter(pk=email.pk).update(
+                            next_attempt_at=now + get_backoff(email.attempts), last_error=str(e),
+                        )
+                else:
+                    sent_count += 1
+                    EmailOutbox.objects.filter(pk=email.pk).update(
+                        status='sent', sent_at=timezone.now(), last_error='',
+                    )
+    finally:
+        connection.close()
+
+    return sent_count, failed_count
@@ -0,0 +1,137 @@
+# core/overdue.py
+import heapq
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Invoice, OVERDUE_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Changes are re-read with this much overlap so rows committed late, or saved
+# by a web worker whose clock runs behind, are not missed
+CHANGE_OVERLAP = timedelta(minutes=5)
+
+# Timers running in this process, for wake_overdue_timers
+_running_timers = set()
+
+
+def wake_overdue_timers():
+    """Ask the timers running in this process to pick up newly sent invoices now."""
+    for timer in list(_running_timers):
+        timer.wake()
+
+
+class OverdueTimer(threading.Thread):
+    """
+    Moves each sent invoice to 'overdue' the moment its due date passes.
+
+    Upcoming due dates within the horizon are kept in a heap. On every
+    refresh the heap picks up sent invoices saved since the last refresh
+    and extends the horizon window. The first load also covers invoices
+    that fell due while no scheduler was running. Entries do not need to be
+    removed when an invoice is paid or its due date moves, because
+    mark_overdue re-checks status and due date in the database.
+
+    Saves in the scheduler's own process call wake() after commit, so they
+    are refreshed straight away. Saves in other processes (web workers when
+    the scheduler runs elsewhere) are only polled for every refresh
+    interval, so an invoice sent there with a due date already inside that
+    interval can turn overdue up to one interval late.
+    """
+
+    def __init__(self, refresh_interval=None, horizon=None):
+        super().__init__(name='overdue-timer', daemon=True)
+        self.refresh_interval = timedelta(
+            seconds=refresh_interval or getattr(settings, 'OVERDUE_TIMER_REFRESH_INTERVAL', 60)
+        )
+        self.horizon = timedelta(seconds=horizon or getattr(settings, 'OVERDUE_TIMER_HORIZON', 24 * 60 * 60))
+        self.heap = []
+        self.due_dates = {}
+        self.loaded_until = None
+        self.changed_since = None
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+
+    def schedule(self, pk, due_date):
+        if self.due_dates.get(pk) == due_date:
+            return
+        self.due_dates[pk] = due_date
+        heapq.heappush(self.heap, (due_date, pk))
+
+    def refresh(self, now):
+        horizon_end = now + self.horizon
+        sent = Invoice.objects.filter(status='sent').order_by()
+
+        if self.loaded_until is None:
+            rows = sent.filter(due_date__lte=horizon_end)
+        else:
+            rows = sent.filter(due_date__gt=self.loaded_until, due_date__lte=horizon_end)
+        for pk, due_date in rows.values_list('pk', 'due_date'):
+            self.schedule(pk, due_date)
+
+        if self.changed_since is not None:
+            changed = sent.filter(
+                last_modified_timestamp__gte=self.changed_since - CHANGE_OVERLAP,
+                due_date__lte=horizon_end,
+            )
+            for pk, due_date in changed.values_list('pk', 'due_date'):
+                self.schedule(pk, due_date)
+
+        self.loaded_until = horizon_end
+        self.changed_since = now
+
+    def fire(self, now):
+        due = []
+        while self.heap and self.heap[0][0] < now:
+            due_date, pk = heapq.heappop(self.heap)
+            if self.due_dates.get(pk) == due_date:
+                del self.due_dates[pk]
+                due.append(pk)
+
+        updated_count = 0
+        for start in range(0, len(due), OVERDUE_CHUNK_SIZE):
+            batch = due[start:start + OVERDUE_CHUNK_SIZE]
+            updated_count += Invoice.objects.filter(pk__in=batch).mark_overdue(now=now)
+        if updated_count > 0:
+            logger.info(f'Successfully updated {updated_count} invoice(s) to overdue')
+        return updated_count
+
+    def wake(self):
+        """Refresh on the next pass instead of waiting out the refresh interval."""
+        self._wakeup.set()
+
+    def run(self):
+        _running_timers.add(self)
+        try:
+            self._run()
+        finally:
+            _running_timers.discard(self)
+
+    def _run(self):
+        next_refresh = timezone.now()
+        while not self._stopped.is_set():
+            now = timezone.now()
+            try:
+                if now >= next_refresh or self._wakeup.is_set():
+                    self._wakeup.clear()
+                    next_refresh = now + self.refresh_interval
+                    self.refresh(now)
+                self.fire(now)
+            except Exception as e:
+                logger.error(f'Error updating overdue invoices: {str(e)}')
+            finally:
+                close_old_connections()
+
+            wake_at = next_refresh
+            if self.heap and self.heap[0][0] < wake_at:
+                wake_at = self.heap[0][0] + timedelta(milliseconds=1)
+            self._wakeup.wait(max((wake_at - timezone.now()).total_seconds(), 0))
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
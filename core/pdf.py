@@ -0,0 +1,470 @@
+# core/pdf.py
+import hashlib
+import json
+import logging
+import tempfile
+from decimal import Decimal
+
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, Flowable
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+
+from .logos import get_logo_reader
+from .utils import get_currency_symbol
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the layout below changes so previously cached PDFs are not served
+PDF_LAYOUT_VERSION = 2
+PDF_CACHE_DIR = 'invoice_pdfs'
+PDF_SPOOL_SIZE = 5 * 1024 * 1024
+ITEMS_CHUNK_SIZE = 2000
+
+
+def build_styles():
+    """
+    Paragraph and table styles used by InvoiceRenderer. Built once at import;
+    exposed as a function so benchmark_pdf can time what a render used to pay.
+    """
+    sample = getSampleStyleSheet()
+    return {
+        'company': ParagraphStyle('Company', parent=sample['Normal'], fontSize=11, leading=14),
+        'invoice_title': ParagraphStyle('InvoiceTitle', parent=sample['Heading1'],
+                                        fontSize=28, fontName='Helvetica-Bold',
+                                        textColor=colors.HexColor('#333333'),
+                                        alignment=TA_RIGHT, spaceAfter=10),
+        'invoice_info': ParagraphStyle('InvoiceInfo', parent=sample['Normal'],
+                                       fontSize=11, leading=14, alignment=TA_RIGHT),
+        'bill_to': ParagraphStyle('BillTo', parent=sample['Heading2'],
+                                  fontSize=12, fontName='Helvetica-Bold'),
+        'client': ParagraphStyle('Client', parent=sample['Normal'], fontSize=11, leading=14),
+        'notes_heading': ParagraphStyle('NotesHeading', parent=sample['Heading2'],
+                                        fontSize=12, fontName='Helvetica-Bold'),
+        'notes_text': ParagraphStyle('NotesText', parent=sample['Normal'],
+                                     fontSize=10, leading=14),
+        'footer_text': ParagraphStyle('FooterText', parent=sample['Normal'],
+                                      fontSize=9, alignment=TA_CENTER, leading=12),
+        'business_footer': ParagraphStyle('BusinessFooter', parent=sample['Normal'],
+                                          fontSize=8, alignment=TA_CENTER,
+                                          textColor=colors.HexColor('#666666')),
+        'header_table': TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+        ]),
+        'items_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, 0), 'RIGHT'),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ]),
+        'totals_table': TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ]),
+        'total_table': TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 14),
+            ('LINEABOVE', (0, 0), (-1, 0), 2, colors.black),
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f0f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]),
+        'notes_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f9f9f9')),
+            ('LEFTPADDING', (0, 0), (-1, -1), 15),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('LINEABOVE', (0, 0), (-1, 0), 4, colors.HexColor('#007bff')),
+        ]),
+        'page_subtotal_table': TableStyle([
+            ('SPAN', (0, 0), (2, 0)),
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Oblique'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f0f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ]),
+        'footer_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fff3cd')),
+            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#ffc107')),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ]),
+    }
+
+
+STYLES = build_styles()
+
+FOOTER_AD = "💼 Simplify Your Business - Try our complete accounting suite at www.example.com/accounting"
+ITEMS_HEADER = ['Description', 'Quantity', 'Unit Price', 'Total']
+ITEMS_COL_WIDTHS = [3*inch, 1*inch, 1.25*inch, 1.25*inch]
+# Rows turned into table cells at a time; widened when a page holds more
+ITEMS_TABLE_WINDOW = 64
+
+def build_static_fragments():
+    """
+    Flowables that are the same on every invoice. ReportLab flowables keep
+    wrap and split state from the document they were laid out in, so these
+    are built for each render; only the styles behind them are shared.
+    """
+    footer_table = Table([[Paragraph(FOOTER_AD, STYLES['footer_text'])]], colWidths=[6.5*inch])
+    footer_table.setStyle(STYLES['footer_table'])
+    return {
+        'invoice_title': Paragraph("INVOICE", STYLES['invoice_title']),
+        'bill_to': Paragraph("Bill To:", STYLES['bill_to']),
+        'notes_heading': Paragraph("Notes:", STYLES['notes_heading']),
+        'footer_ad': footer_table,
+    }
+
+
+class LogoImage(Flowable):
+    """
+    Draws a shared ImageReader at a fixed size. platypus.Image only takes
+    files, which would decode the logo again on every render.
+    """
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.hAlign = 'CENTER'
+        self.reader = reader
+        self.drawWidth = width
+        self.drawHeight = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask='auto')
+
+
+class ItemsTable(LongTable):
+    """
+    Line item table that repeats its header row on every page and closes
+    each page it breaks across with a subtotal of that page's lines.
+
+    Only a window of the rows is made into table cells at a time. Splitting
+    a table copies everything after the break, so a single table over every
+    item made each page cost as much as all the pages after it; here a page
+    break only builds the window that starts on the next page.
+    """
+
+    def __init__(self, *args, rows=None, line_totals=None, start=0, page_subtotal=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rows = rows
+        self.line_totals = line_totals
+        self.start = start
+        self.end = start + len(self._cellvalues) - self.repeatRows
+        self.page_subtotal = page_subtotal
+
+    @classmethod
+    def for_rows(cls, rows, line_totals, page_subtotal, start=0, window=ITEMS_TABLE_WINDOW):
+        table = cls([ITEMS_HEADER, *rows[start:start + window]], colWidths=ITEMS_COL_WIDTHS, repeatRows=1,
+                    rows=rows, line_totals=line_totals, start=start, page_subtotal=page_subtotal)
+        table.setStyle(STYLES['items_table'])
+        return table
+
+    def has_more_rows(self):
+        return self.rows is not None and self.end < len(self.rows)
+
+    def wrap(self, availWidth, availHeight):
+        width, height = super().wrap(availWidth, availHeight)
+        if self.has_more_rows():
+            # Rows beyond the window follow, so make the frame call split() to lay them out
+            height = max(height, availHeight + 1)
+        return width, height
+
+    def split(self, availWidth, availHeight):
+        # Widen the window until it overfills the page or holds every remaining row
+        table = self
+        while table.has_more_rows() and LongTable.wrap(table, availWidth, availHeight)[1] <= availHeight:
+            table = self.for_rows(self.rows, self.line_totals, self.page_subtotal,
+                                  start=self.start, window=(table.end - table.start) * 2)
+        if not table.has_more_rows() and LongTable.wrap(table, availWidth, availHeight)[1] <= availHeight:
+            return [table]
+
+        # Leave room on this page for the subtotal row
+        _, subtotal_height = self.page_subtotal(Decimal('0')).wrap(availWidth, availHeight)
+        parts = LongTable.split(table, availWidth, availHeight - subtotal_height)
+        if len(parts) != 2:
+            return parts
+
+        first = parts[0]
+        end = self.start + len(first._cellvalues) - self.repeatRows
+        subtotal = sum(self.line_totals[self.start:end], Decimal('0'))
+        # Carry on with a fresh window rather than the rest of this one
+        rest = self.for_rows(self.rows, self.line_totals, self.page_subtotal, start=end)
+        return [first, self.page_subtotal(subtotal), rest]
+
+
+class InvoiceRenderer:
+    """
+    Lays out an invoice PDF with ReportLab. Styles are shared by every
+    render in the process; all flowables are built per document.
+    """
+
+    def __init__(self, invoice, profile, items):
+        self.invoice = invoice
+        self.profile = profile
+        self.items = items
+        self.currency_symbol = get_currency_symbol(invoice.currency)
+        self.fragments = build_static_fragments()
+
+    def render(self, output):
+        """Build the PDF into output (any writable file-like object)."""
+        doc = SimpleDocTemplate(output, pagesize=letter,
+                                topMargin=0.3*inch,
+                                bottomMargin=0.75*inch,
+                                leftMargin=0.75*inch,
+                                rightMargin=0.75*inch)
+        doc.build(self.build_story())
+
+    def build_story(self):
+        return [
+            *self.build_header(),
+            *self.build_bill_to(),
+            *self.build_items(),
+            *self.build_totals(),
+            *self.build_notes(),
+            *self.build_footer(),
+        ]
+
+    def money(self, amount):
+        return f"{self.currency_symbol}{amount}"
+
+    def build_logo(self):
+        try:
+            reader = get_logo_reader(self.profile)
+            if reader is None:
+                return None
+            img_width, img_height = reader.getSize()
+            max_width = 150
+            max_height = 80
+            aspect = img_height / float(img_width)
+
+            if img_width > max_width:
+                img_width = max_width
+                img_height = img_width * aspect
+            if img_height > max_height:
+                img_height = max_height
+                img_width = img_height / aspect
+
+            return LogoImage(reader, img_width, img_height)
+        except Exception as e:
+            logger.error(f"Error loading logo: {e}")
+            return None
+
+    def build_header(self):
+        invoice, profile = self.invoice, self.profile
+        company_style = STYLES['company']
+        info_style = STYLES['invoice_info']
+
+        # Left side - Company info
+        left_content = []
+        logo = self.build_logo()
+        if logo is not None:
+            left_content.append(logo)
+            left_content.append(Spacer(1, 0.1*inch))
+        left_content.append(Paragraph(f"<b>{profile.business_name}</b>", company_style))
+        left_content.append(Paragraph(profile.street_address, company_style))
+        left_content.append(Paragraph(f"{profile.city}, {profile.state_province} {profile.zip_postal_code}", company_style))
+        left_content.append(Paragraph(profile.country, company_style))
+        left_content.append(Paragraph(f"Email: {profile.business_email}", company_style))
+        left_content.append(Paragraph(f"Phone: {profile.phone_country_code} {profile.phone_number}", company_style))
+
+        # Right side - Invoice title and info
+        right_content = [
+            self.fragments['invoice_title'],
+            Paragraph(f"<b>Invoice #:</b> {invoice.invoice_number}", info_style),
+            Paragraph(f"<b>Date:</b> {invoice.invoice_date.strftime('%B %d, %Y')}", info_style),
+            Paragraph(f"<b>Due Date:</b> {invoice.due_date.strftime('%B %d, %Y')}", info_style),
+            Paragraph(f"<b>Status:</b> {invoice.get_status_display().upper()}", info_style),
+        ]
+
+        header_table = Table([[left_content, right_content]], colWidths=[3.25*inch, 3.25*inch])
+        header_table.setStyle(STYLES['header_table'])
+        return [header_table, Spacer(1, 0.3*inch)]
+
+    def build_bill_to(self):
+        client = self.invoice.client
+        client_style = STYLES['client']
+        return [
+            self.fragments['bill_to'],
+            Spacer(1, 0.1*inch),
+            Paragraph(f"<b>{client.name}</b>", client_style),
+            Paragraph(client.street_address, client_style),
+            Paragraph(f"{client.city}, {client.state_province} {client.zip_postal_code}", client_style),
+            Paragraph(client.country, client_style),
+            Paragraph(f"Email: {client.email}", client_style),
+            Paragraph(f"Phone: {client.phone}", client_style),
+            Spacer(1, 0.3*inch),
+        ]
+
+    def build_items(self):
+        # Only the cell text is kept, so items can be streamed with .iterator()
+        items_data = []
+        line_totals = []
+        for item in self.items:
+            items_data.append([
+                item.description,
+                str(item.quantity),
+                self.money(item.unit_price),
+                self.money(item.line_total),
+            ])
+            line_totals.append(item.line_total)
+
+        items_table = ItemsTable.for_rows(items_data, line_totals, self.build_page_subtotal)
+        return [items_table, Spacer(1, 0.3*inch)]
+
+    def build_page_subtotal(self, amount):
+        subtotal_table = Table([['Page subtotal:', '', '', self.money(amount)]], colWidths=ITEMS_COL_WIDTHS)
+        subtotal_table.setStyle(STYLES['page_subtotal_table'])
+        return subtotal_table
+
+    def build_totals(self):
+        invoice = self.invoice
+        totals_table = Table([
+            ['Subtotal:', self.money(invoice.subtotal)],
+            ['Tax ({0}%):'.format(invoice.tax_rate), self.money(invoice.tax_amount)],
+            ['Discount:', self.money(invoice.discount_amount)],
+        ], colWidths=[4.5*inch, 2*inch])
+        totals_table.setStyle(STYLES['totals_table'])
+
+        # Total row - separate table with bold styling
+        total_table = Table([['Total:', self.money(invoice.total_amount)]], colWidths=[4.5*inch, 2*inch])
+        total_table.setStyle(STYLES['total_table'])
+        return [totals_table, total_table]
+
+    def build_notes(self):
+        if not self.invoice.notes:
+            return []
+        notes_table = Table([[Paragraph(self.invoice.notes, STYLES['notes_text'])]], colWidths=[6.5*inch])
+        notes_table.setStyle(STYLES['notes_table'])
+        return [
+            Spacer(1, 0.4*inch),
+            self.fragments['notes_heading'],
+            Spacer(1, 0.1*inch),
+            notes_table,
+            Spacer(1, 0.3*inch),
+        ]
+
+    def build_footer(self):
+        business_footer = "Thank you for your business! | {0} | {1}".format(
+            self.profile.business_name, self.profile.business_email)
+        return [
+            Spacer(1, 0.5*inch),
+            self.fragments['footer_ad'],
+            Spacer(1, 0.1*inch),
+            Paragraph(business_footer, STYLES['business_footer']),
+        ]
+
+
+def render_invoice_pdf(invoice, profile, items, output):
+    """Build the invoice PDF into output (any writable file-like object)."""
+    InvoiceRenderer(invoice, profile, items).render(output)
+
+
+def get_logo_fingerprint(profile):
+    """Name, size and modification time of the logo, so replacing it changes the cache key."""
+    logo = profile.logo_pdf or profile.business_logo
+    if not logo:
+        return None
+    try:
+        return [logo.name, logo.size, logo.storage.get_modified_time(logo.name).isoformat()]
+    except (OSError, NotImplementedError):
+        return [logo.name]
+
+
+def get_pdf_cache_key(invoice, profile, items):
+    """Hash of everything that ends up in the rendered PDF."""
+    client = invoice.client
+    content = {
+        'layout': PDF_LAYOUT_VERSION,
+        'invoice': [
+            invoice.invoice_number, invoice.invoice_date.isoformat(), invoice.due_date.isoformat(),
+            invoice.status, invoice.currency, str(invoice.subtotal), str(invoice.tax_rate),
+            str(invoice.tax_amount), str(invoice.discount_amount), str(invoice.total_amount), invoice.notes,
+        ],
+        'client': [
+            client.name, client.street_address, client.city, client.state_province,
+            client.zip_postal_code, client.country, client.email, client.phone,
+        ],
+        'items': [
+            [item.description, str(item.quantity), str(item.unit_price), str(item.line_total)]
+            for item in items
+        ],
+        'profile': [
+            profile.business_name, profile.street_address, profile.city, profile.state_province,
+            profile.zip_postal_code, profile.country, profile.business_email,
+            profile.phone_country_code, profile.phone_number,
+        ],
+        'logo': get_logo_fingerprint(profile),
+    }
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+def get_invoice_pdf_cache_key(invoice, profile):
+    """Cache key of the invoice as stored, streaming its items rather than holding them all."""
+    return get_pdf_cache_key(invoice, profile, invoice.items.iterator(ITEMS_CHUNK_SIZE))
+
+
+def get_pdf_cache_path(invoice, cache_key):
+    return f'{PDF_CACHE_DIR}/{invoice.pk}/{cache_key}.pdf'
+
+
+def get_or_render_invoice_pdf(invoice, profile, items=None, cache_key=None):
+    """
+    Return the storage path of the invoice PDF, rendering and storing it
+    only when nothing with the same content hash is cached yet. Older
+    renders of the same invoice are removed when a new one is stored.
+    """
+    if items is None:
+        # Stream the items from the database for the hash and again for the render,
+        # rather than holding thousands of model instances
+        cache_key = cache_key or get_invoice_pdf_cache_key(invoice, profile)
+        items = invoice.items.iterator(ITEMS_CHUNK_SIZE)
+    path = get_pdf_cache_path(invoice, cache_key or get_pdf_cache_key(invoice, profile, items))
+    if default_storage.exists(path):
+        return path
+
+    # Large PDFs spill to disk instead of being held in memory twice on the way to storage
+    with tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_SIZE) as buffer:
+        render_invoice_pdf(invoice, profile, items, buffer)
+        buffer.seek(0)
+        path = default_storage.save(path, File(buffer))
+    delete_cached_pdfs(invoice.pk, keep=path)
+    return path
+
+
+def delete_cached_pdfs(invoice_pk, keep=None):
+    directory = f'{PDF_CACHE_DIR}/{invoice_pk}'
+    try:
+        _, names = default_storage.listdir(directory)
+    except (OSError, NotImplementedError):
+        return
+    for name in names:
+        if f'{directory}/{name}' != keep:
+            default_storage.delete(f'{directory}/{name}')
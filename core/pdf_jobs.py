@@ -0,0 +1,147 @@
+# core/pdf_jobs.py
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .export import create_render_pool, export_invoice_pdf, get_export_workers, run_invoice_exports
+from .models import PdfRenderJob
+from .pdf import get_pdf_cache_path
+
+logger = logging.getLogger(__name__)
+
+# A job still marked running after this long belonged to a worker that died; run it again
+RUNNING_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_pdf_render(invoice, now=None):
+    """
+    Ask the PDF worker to render the invoice's current PDF. Can be called
+    inside the transaction that changes the invoice. Returns the job.
+    """
+    now = now or timezone.now()
+    job, created = PdfRenderJob.objects.get_or_create(invoice=invoice, defaults={'requested_at': now})
+    if not created:
+        # A running render is left alone; it is queued again when it sees the newer request
+        PdfRenderJob.objects.filter(pk=job.pk).update(
+            requested_at=now,
+            status=Case(When(status='running', then=Value('running')), default=Value('pending')),
+            attempts=Case(When(status='running', then=F('attempts')), default=Value(0)),
+        )
+        job.refresh_from_db()
+    return job
+
+
+def get_pdf_status(invoice, cache_key=None):
+    """
+    'ready' when the invoice's PDF can be downloaded, otherwise the status
+    of its render job, or None if no render was requested.
+
+    Without cache_key only the job is looked up, so polling never reads the
+    items; a finished job counts as ready and the download checks the hash.
+    With cache_key, a PDF cached under it is ready, and a finished job whose
+    PDF has gone out of date is queued again.
+    """
+    status = PdfRenderJob.objects.filter(invoice=invoice).values_list('status', flat=True).first()
+    if status in ('pending', 'running'):
+        return status
+    if cache_key is None:
+        return 'ready' if status == 'done' else status
+    if default_storage.exists(get_pdf_cache_path(invoice, cache_key)):
+        return 'ready'
+    if status == 'done':
+        # Rendered, but the invoice has changed since
+        return enqueue_pdf_render(invoice).status
+    return status
+
+
+def claim_pdf_render_jobs(batch_size, now):
+    with transaction.atomic():
+        # Locked rows are being claimed by another worker; leave them to it
+        jobs = list(
+            PdfRenderJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', started_at__lt=now - RUNNING_TIMEOUT))
+            .order_by('requested_at')[:batch_size]
+        )
+        for job in jobs:
+            job.status = 'running'
+            job.started_at = now
+            job.attempts += 1
+        PdfRenderJob.objects.bulk_update(jobs, ['status', 'started_at', 'attempts'])
+    return jobs
+
+
+def run_pdf_render_jobs(batch_size=None, workers=None, max_attempts=None, now=None):
+    """
+    Claim a batch of queued jobs and render them across a process pool.
+    Failed renders are retried up to max_attempts times. Returns a
+    (rendered, failed) tuple of counts.
+    """
+    batch_size = batch_size or getattr(settings, 'PDF_RENDER_BATCH_SIZE', 20)
+    max_attempts = max_attempts or getattr(settings, 'PDF_RENDER_MAX_ATTEMPTS', 3)
+    now = now or timezone.now()
+
+    jobs = claim_pdf_render_jobs(batch_size, now)
+    if not jobs:
+        return 0, 0
+
+    rendered_count = 0
+    failed_count = 0
+    with create_render_pool(min(get_export_workers(workers), len(jobs))) as pool:
+        futures = [(job, pool.submit(export_invoice_pdf, job.invoice_id)) for job in jobs]
+        for job, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f'Error rendering PDF for invoice {job.invoice_id}: {str(e)}')
+                status = 'failed' if job.attempts >= max_attempts else 'pending'
+                if status == 'failed':
+                    failed_count += 1
+                PdfRenderJob.objects.filter(pk=job.pk, started_at=job.started_at).update(
+                    status=status, last_error=str(e), finished_at=timezone.now(),
+                )
+            else:
+                rendered_count += 1
+                PdfRenderJob.objects.filter(pk=job.pk, started_at=job.started_at).update(
+                    # Requested again while rendering, so this PDF may already be out of date
+                    status=Case(When(requested_at__gt=job.started_at, then=Value('pending')), default=Value('done')),
+                    last_error='',
+                    finished_at=timezone.now(),
+                )
+
+    return rendered_count, failed_count
+
+
+class PdfRenderWorker(threading.Thread):
+    """
+    Renders queued PDFs and builds queued ZIP exports for as long as the
+    scheduler runs, checking for new jobs every PDF_RENDER_POLL_INTERVAL
+    seconds.
+    """
+
+    def __init__(self, interval=None):
+        super().__init__(name='pdf-render-worker', daemon=True)
+        self.interval = interval or getattr(settings, 'PDF_RENDER_POLL_INTERVAL', 5)
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                rendered_count, failed_count = run_pdf_render_jobs()
+                if rendered_count or failed_count:
+                    logger.info(f'Rendered {rendered_count} queued PDF(s), {failed_count} failed permanently')
+                if run_invoice_exports():
+                    logger.info('Built 1 invoice export')
+            except Exception as e:
+                logger.error(f'Error rendering queued PDFs: {str(e)}')
+            finally:
+                close_old_connections()
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
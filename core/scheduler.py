@@ -1,13 +1,21 @@
 # core/scheduler.py
+from apscheduler.events import EVENT_SCHEDULER_SHUTDOWN, EVENT_SCHEDULER_STARTED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from django.utils import timezone
 from django_apscheduler.jobstores import DjangoJobStore
 from django_apscheduler.models import DjangoJobExecution
 from django_apscheduler import util
+from django.conf import settings
+from django.utils import timezone
 import logging
 
+from .export import delete_old_exports
+from .leader import LeaderElection
 from .models import Invoice
+from .outbox import send_queued_emails
+from .overdue import OverdueTimer
+from .pdf_jobs import PdfRenderWorker
+from . import utils
 
 logger = logging.getLogger(__name__)
 
@@ -16,23 +24,11 @@ logger = logging.getLogger(__name__)
 def update_overdue_invoices():
     """
     Job function to update overdue invoices.
-    Runs automatically every hour.
+    The OverdueTimer handles invoices as they fall due; this sweep is a
+    backstop for anything it missed. Runs automatically once a day.
     """
     try:
-        now = timezone.now()
-        
-        # Find all 'sent' invoices that are past due date
-        overdue_invoices = Invoice.objects.filter(
-            status='sent',
-            due_date__lt=now
-        )
-        
-        updated_count = 0
-        for invoice in overdue_invoices:
-            invoice.status = 'overdue'
-            invoice.save(update_fields=['status', 'last_modified_timestamp'])
-            updated_count += 1
-            logger.info(f'Updated invoice {invoice.invoice_number} to overdue')
+        updated_count = Invoice.objects.mark_overdue()
         
         if updated_count > 0:
             logger.info(f'Successfully updated {updated_count} invoice(s) to overdue')
@@ -43,6 +39,33 @@ def update_overdue_invoices():
         logger.error(f'Error updating overdue invoices: {str(e)}')
 
 
+@util.close_old_connections
+def refresh_exchange_rates():
+    """
+    Job function to snapshot exchange rates for all supported currencies.
+    Runs automatically when the scheduler starts and every 6 hours.
+    """
+    try:
+        stored_count = utils.refresh_exchange_rates()
+        logger.info(f'Stored {stored_count} exchange rate(s)')
+    except Exception as e:
+        logger.error(f'Error refreshing exchange rates: {str(e)}')
+
+
+@util.close_old_connections
+def deliver_queued_emails():
+    """
+    Job function to send queued emails over a single mail connection.
+    Runs automatically every minute.
+    """
+    try:
+        sent_count, failed_count = send_queued_emails()
+        if sent_count or failed_count:
+            logger.info(f'Sent {sent_count} queued email(s), {failed_count} failed permanently')
+    except Exception as e:
+        logger.error(f'Error sending queued emails: {str(e)}')
+
+
 @util.close_old_connections
 def delete_old_job_executions(max_age=604_800):
     """
@@ -52,17 +75,43 @@ def delete_old_job_executions(max_age=604_800):
     DjangoJobExecution.objects.delete_old_job_executions(max_age)
 
 
-def start_scheduler():
+@util.close_old_connections
+def delete_old_invoice_exports():
     """
-    Start the APScheduler to run background jobs.
+    Delete invoice exports, and their ZIP files, older than INVOICE_EXPORT_MAX_AGE.
+    Runs automatically once a day.
+    """
+    try:
+        deleted_count = delete_old_exports(settings.INVOICE_EXPORT_MAX_AGE)
+        if deleted_count:
+            logger.info(f'Deleted {deleted_count} old invoice export(s)')
+    except Exception as e:
+        logger.error(f'Error deleting old invoice exports: {str(e)}')
+
+
+def add_jobs(scheduler):
+    """
+    Register all of our jobs on the given scheduler.
     """
-    scheduler = BackgroundScheduler()
     scheduler.add_jobstore(DjangoJobStore(), "default")
 
-    # Update overdue invoices every hour
+    # Move each invoice to overdue the moment it falls due, and render queued PDFs,
+    # for as long as the scheduler runs
+    threads = [OverdueTimer(), PdfRenderWorker()]
+
+    def start_or_stop_threads(event):
+        for thread in threads:
+            if event.code == EVENT_SCHEDULER_STARTED:
+                thread.start()
+            elif thread.is_alive():
+                thread.stop()
+
+    scheduler.add_listener(start_or_stop_threads, EVENT_SCHEDULER_STARTED | EVENT_SCHEDULER_SHUTDOWN)
+
+    # Backstop sweep for overdue invoices once a day
     scheduler.add_job(
         update_overdue_invoices,
-        trigger=CronTrigger(minute="0"),  # Run at the top of every hour
+        trigger=CronTrigger(hour="0", minute="5"),  # Every day at 00:05
         id="update_overdue_invoices",
         max_instances=1,
         replace_existing=True,
@@ -70,6 +119,40 @@ def start_scheduler():
     )
     logger.info("Added job 'update_overdue_invoices'.")
 
+    # Deliver queued emails every minute
+    scheduler.add_job(
+        deliver_queued_emails,
+        trigger=CronTrigger(minute="*"),
+        id="deliver_queued_emails",
+        max_instances=1,
+        replace_existing=True,
+        name="Deliver queued emails"
+    )
+    logger.info("Added job 'deliver_queued_emails'.")
+
+    # Snapshot exchange rates every 6 hours, and straight away so a fresh deploy has rates to convert with
+    scheduler.add_job(
+        refresh_exchange_rates,
+        trigger=CronTrigger(hour="*/6", minute="15"),
+        next_run_time=timezone.now(),
+        id="refresh_exchange_rates",
+        max_instances=1,
+        replace_existing=True,
+        name="Refresh exchange rates"
+    )
+    logger.info("Added job 'refresh_exchange_rates'.")
+
+    # Remove exports nobody downloaded once a day
+    scheduler.add_job(
+        delete_old_invoice_exports,
+        trigger=CronTrigger(hour="1", minute="0"),  # Every day at 01:00
+        id="delete_old_invoice_exports",
+        max_instances=1,
+        replace_existing=True,
+        name="Delete old invoice exports"
+    )
+    logger.info("Added job 'delete_old_invoice_exports'.")
+
     # Clean up old job executions every week
     scheduler.add_job(
         delete_old_job_executions,
@@ -83,10 +166,38 @@ def start_scheduler():
     )
     logger.info("Added weekly job: 'delete_old_job_executions'.")
 
-    try:
+    return scheduler
+
+
+def create_scheduler():
+    """
+    Build a BackgroundScheduler with all of our jobs registered.
+    """
+    return add_jobs(BackgroundScheduler())
+
+
+def start_scheduler():
+    """
+    Start the APScheduler to run background jobs.
+
+    Every web worker calls this, but only the process holding the leader lock
+    actually runs the scheduler; the others stand by and take over when the
+    leader exits.
+    """
+    state = {}
+
+    def on_elected():
         logger.info("Starting scheduler...")
-        scheduler.start()
-    except KeyboardInterrupt:
-        logger.info("Stopping scheduler...")
-        scheduler.shutdown()
-        logger.info("Scheduler shut down successfully!")
\ No newline at end of file
+        state['scheduler'] = create_scheduler()
+        state['scheduler'].start()
+
+    def on_deposed():
+        scheduler = state.pop('scheduler', None)
+        if scheduler is not None:
+            logger.info("Stopping scheduler...")
+            scheduler.shutdown(wait=False)
+            logger.info("Scheduler shut down successfully!")
+
+    election = LeaderElection(on_elected, on_deposed)
+    election.start()
+    return election
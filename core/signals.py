@@ -0,0 +1,67 @@
+# core/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_dashboard_version
+from .models import BusinessProfile, Client, Invoice, InvoiceItem, UserInvoiceStats
+from .overdue import wake_overdue_timers
+from .pdf import delete_cached_pdfs
+
+
+@receiver(pre_save, sender=Invoice)
+def snapshot_invoice_stats(sender, instance, **kwargs):
+    """Load the stored stats key for invoices that were not fully fetched from the database."""
+    if instance.pk and not hasattr(instance, '_stats_snapshot'):
+        stored = Invoice.objects.filter(pk=instance.pk).values_list(
+            'user_id', 'status', 'currency', 'total_amount'
+        ).first()
+        instance._stats_snapshot = stored
+
+
+@receiver(post_save, sender=Invoice)
+def update_invoice_stats(sender, instance, created, **kwargs):
+    old_key = None if created else getattr(instance, '_stats_snapshot', None)
+    new_key = instance.get_stats_key()
+    UserInvoiceStats.record_invoice_change(old_key, new_key)
+    instance._stats_snapshot = new_key
+
+
+@receiver(post_delete, sender=Invoice)
+def remove_invoice_stats(sender, instance, **kwargs):
+    old_key = getattr(instance, '_stats_snapshot', None) or instance.get_stats_key()
+    UserInvoiceStats.record_invoice_change(old_key, None)
+
+
+@receiver(post_save, sender=Invoice)
+def wake_overdue_timer(sender, instance, **kwargs):
+    """Let a timer in this process schedule the invoice without waiting for its next refresh."""
+    if instance.status == 'sent':
+        transaction.on_commit(wake_overdue_timers)
+
+
+@receiver(post_delete, sender=Invoice)
+def remove_cached_pdfs(sender, instance, **kwargs):
+    delete_cached_pdfs(instance.pk)
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=BusinessProfile)
+@receiver(post_delete, sender=BusinessProfile)
+def invalidate_dashboard(sender, instance, **kwargs):
+    bump_dashboard_version(instance.user_id)
+
+
+@receiver(post_save, sender=InvoiceItem)
+@receiver(post_delete, sender=InvoiceItem)
+def invalidate_dashboard_for_item(sender, instance, **kwargs):
+    if InvoiceItem.invoice.is_cached(instance):
+        user_id = instance.invoice.user_id
+    else:
+        # The invoice may already be gone when items are deleted by a cascade
+        user_id = Invoice.objects.filter(pk=instance.invoice_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        bump_dashboard_version(user_id)
@@ -1,48 +1,71 @@
 // Real-time invoice calculation - FIXED VERSION
+// Mirrors core/calculator.py: amounts are worked out in integer cents and
+// rounded half up at the same steps, so the preview matches the saved invoice.
+
+// Parse a 2-decimal form value into an integer number of hundredths
+function toHundredths(value) {
+    return Math.round((parseFloat(value) || 0) * 100);
+}
+
+// Divide a non-negative integer by divisor, rounding halves up
+function divideHalfUp(value, divisor) {
+    return Math.floor((value + divisor / 2) / divisor);
+}
+
+function formatCents(cents) {
+    const sign = cents < 0 ? '-' : '';
+    const abs = Math.abs(cents);
+    return sign + Math.floor(abs / 100) + '.' + String(abs % 100).padStart(2, '0');
+}
+
+// Work out every amount in cents from [quantity, unitPrice] form values.
+// core/tests/calculator_cases.json holds the cases both calculators are checked against.
+function computeTotals(lines, taxRateValue, discountValue) {
+    const lineCents = lines.map(function([quantity, unitPrice]) {
+        return divideHalfUp(toHundredths(quantity) * toHundredths(unitPrice), 100);
+    });
+    const subtotalCents = lineCents.reduce((sum, cents) => sum + cents, 0);
+
+    // The tax rate is a percentage in hundredths
+    const taxCents = divideHalfUp(subtotalCents * toHundredths(taxRateValue), 10000);
+    const discountCents = toHundredths(discountValue);
+
+    return {
+        lineCents: lineCents,
+        subtotalCents: subtotalCents,
+        taxCents: taxCents,
+        discountCents: discountCents,
+        totalCents: subtotalCents + taxCents - discountCents
+    };
+}
+
 function calculateTotals() {
     console.log('Calculating totals...');
-    let subtotal = 0;
-
-    // Calculate line totals for each item
-    $('.item-row').each(function() {
-        const $row = $(this);
-        const isDeleted = $row.find('input[type="checkbox"][name*="DELETE"]').is(':checked');
-        
-        if (!isDeleted) {
-            // Find inputs by name attribute pattern
-            const $qtyInput = $row.find('input[name*="quantity"]');
-            const $priceInput = $row.find('input[name*="unit_price"]');
-            
-            const quantity = parseFloat($qtyInput.val()) || 0;
-            const unitPrice = parseFloat($priceInput.val()) || 0;
-            const lineTotal = quantity * unitPrice;
-            
-            console.log('Row - Qty:', quantity, 'Price:', unitPrice, 'Total:', lineTotal);
-            
-            $row.find('.line-total').val(lineTotal.toFixed(2));
-            subtotal += lineTotal;
-        } else {
-            $row.find('.line-total').val('0.00');
-        }
+    const $rows = $('.item-row').filter(function() {
+        return !$(this).find('input[type="checkbox"][name*="DELETE"]').is(':checked');
     });
 
-    // Get tax rate and discount
-    const taxRate = parseFloat($('#id_tax_rate').val()) || 0;
-    const discountAmount = parseFloat($('#id_discount_amount').val()) || 0;
+    // Find inputs by name attribute pattern
+    const lines = $rows.map(function() {
+        const $row = $(this);
+        return [[$row.find('input[name*="quantity"]').val(), $row.find('input[name*="unit_price"]').val()]];
+    }).get();
 
-    // Calculate tax amount
-    const taxAmount = (subtotal * taxRate) / 100;
+    const totals = computeTotals(lines, $('#id_tax_rate').val(), $('#id_discount_amount').val());
 
-    // Calculate total
-    const total = subtotal + taxAmount - discountAmount;
+    $('.item-row').find('.line-total').val('0.00');
+    $rows.each(function(index) {
+        console.log('Row - Qty:', lines[index][0], 'Price:', lines[index][1], 'Total:', formatCents(totals.lineCents[index]));
+        $(this).find('.line-total').val(formatCents(totals.lineCents[index]));
+    });
 
-    console.log('Subtotal:', subtotal, 'Tax:', taxAmount, 'Discount:', discountAmount, 'Total:', total);
+    console.log('Subtotal:', formatCents(totals.subtotalCents), 'Tax:', formatCents(totals.taxCents), 'Discount:', formatCents(totals.discountCents), 'Total:', formatCents(totals.totalCents));
 
     // Update display
-    $('#subtotal-display').text(subtotal.toFixed(2));
-    $('#tax-display').text(taxAmount.toFixed(2));
-    $('#discount-display').text(discountAmount.toFixed(2));
-    $('#total-display').text(total.toFixed(2));
+    $('#subtotal-display').text(formatCents(totals.subtotalCents));
+    $('#tax-display').text(formatCents(totals.taxCents));
+    $('#discount-display').text(formatCents(totals.discountCents));
+    $('#total-display').text(formatCents(totals.totalCents));
 }
 
 $(document).ready(function() {
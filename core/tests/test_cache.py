@@ -0,0 +1,29 @@
+# core/tests/test_cache.py
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from core.cache import bump_dashboard_version, get_cached_dashboard, set_cached_dashboard
+
+
+class DashboardCacheTests(TestCase):
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_not_cached_on_process_local_backend(self):
+        context, version = get_cached_dashboard(1)
+        set_cached_dashboard(1, version, {'total': 1})
+        self.assertEqual(get_cached_dashboard(1), (None, None))
+
+    def test_bump_invalidates_on_shared_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        with override_settings(CACHES={'default': backend}):
+            context, version = get_cached_dashboard(1)
+            self.assertIsNone(context)
+            set_cached_dashboard(1, version, {'total': 1})
+            self.assertEqual(get_cached_dashboard(1), ({'total': 1}, version))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_dashboard_version(1)
+            self.assertIsNone(get_cached_dashboard(1)[0])
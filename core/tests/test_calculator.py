@@ -0,0 +1,64 @@
+# core/tests/test_calculator.py
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.calculator import InvoiceCalculator
+
+CASES_PATH = Path(__file__).with_name('calculator_cases.json')
+CALCULATOR_JS_PATH = Path(settings.BASE_DIR) / 'core' / 'static' / 'js' / 'invoice_calculator.js'
+
+with open(CASES_PATH) as f:
+    CASES = json.load(f)
+
+# Loads invoice_calculator.js without a browser and prints its totals for every case
+NODE_SCRIPT = """
+const fs = require('fs');
+const vm = require('vm');
+const [jsPath, casesPath] = process.argv.slice(1);
+const context = {$: () => ({ready() {}}), document: {}, console: {log() {}}};
+vm.runInNewContext(fs.readFileSync(jsPath, 'utf8'), context);
+const results = JSON.parse(fs.readFileSync(casesPath, 'utf8')).map(function({inputs}) {
+    const totals = context.computeTotals(inputs.lines, inputs.tax_rate, inputs.discount_amount);
+    return {
+        line_totals: totals.lineCents.map(context.formatCents),
+        subtotal: context.formatCents(totals.subtotalCents),
+        tax_amount: context.formatCents(totals.taxCents),
+        discount_amount: context.formatCents(totals.discountCents),
+        total_amount: context.formatCents(totals.totalCents),
+    };
+});
+console.log(JSON.stringify(results));
+"""
+
+
+class InvoiceCalculatorTests(SimpleTestCase):
+    def test_cases(self):
+        for case in CASES:
+            with self.subTest(case['name']):
+                inputs = case['inputs']
+                totals = InvoiceCalculator(inputs['tax_rate'], inputs['discount_amount']).calculate(inputs['lines'])
+                self.assertEqual({
+                    'line_totals': [str(amount) for amount in totals.line_totals],
+                    'subtotal': str(totals.subtotal),
+                    'tax_amount': str(totals.tax_amount),
+                    'discount_amount': str(totals.discount_amount),
+                    'total_amount': str(totals.total_amount),
+                }, case['expected'])
+
+
+@skipUnless(shutil.which('node'), 'node is not installed')
+class InvoiceCalculatorJsTests(SimpleTestCase):
+    def test_cases(self):
+        output = subprocess.run(
+            ['node', '-e', NODE_SCRIPT, str(CALCULATOR_JS_PATH), str(CASES_PATH)],
+            capture_output=True, text=True, check=True, timeout=30,
+        ).stdout
+        for case, result in zip(CASES, json.loads(output), strict=True):
+            with self.subTest(case['name']):
+                self.assertEqual(result, case['expected'])
@@ -0,0 +1,32 @@
+# core/tests/test_exchange_rates.py
+from datetime import timedelta
+from decimal import Decimal
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from django.test import TestCase
+from django.utils import timezone
+
+from core import utils
+from core.models import ExchangeRateTable
+from core.scheduler import add_jobs
+
+
+class RateTableTests(TestCase):
+    def setUp(self):
+        utils._rate_tables.clear()
+        self.addCleanup(utils._rate_tables.clear)
+
+    def test_missing_snapshot_is_looked_for_again_soon(self):
+        self.assertIsNone(utils.get_rate_table('USD'))
+        ExchangeRateTable.objects.create(base_currency='USD', rates={'EUR': '0.9'}, fetched_at=timezone.now())
+
+        rates, loaded_at = utils._rate_tables['USD']
+        utils._rate_tables['USD'] = (rates, loaded_at - timedelta(seconds=utils.MISSING_RATE_TABLE_RETRY + 1))
+        self.assertEqual(utils.get_rate_table('USD'), {'EUR': Decimal('0.9')})
+
+
+class SchedulerJobTests(TestCase):
+    def test_exchange_rates_refresh_when_scheduler_starts(self):
+        scheduler = add_jobs(BackgroundScheduler())
+        job = scheduler.get_job('refresh_exchange_rates')
+        self.assertLessEqual(job.next_run_time, timezone.now())
@@ -0,0 +1,53 @@
+# core/tests/test_export.py
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+
+from django.test import override_settings
+from django.urls import reverse
+
+from core.export import run_invoice_exports
+from core.models import InvoiceExport
+
+from .test_views import InvoiceTestCase
+
+
+@override_settings(PDF_EXPORT_SYNC_MAX_INVOICES=2)
+class InvoiceExportTests(InvoiceTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def read_zip(self, response):
+        content = b''.join(response.streaming_content)
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            return archive.namelist()
+
+    def test_small_export_is_streamed(self):
+        invoices = [self.create_invoice(self.first_client) for _ in range(2)]
+
+        response = self.client.get(reverse('invoice_export'))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(self.read_zip(response), [f'Invoice-{invoice.invoice_number}.pdf' for invoice in invoices])
+        self.assertFalse(InvoiceExport.objects.exists())
+
+    def test_large_export_is_built_in_background(self):
+        for _ in range(3):
+            self.create_invoice(self.first_client)
+
+        response = self.client.get(reverse('invoice_export'))
+        export = InvoiceExport.objects.get()
+        self.assertRedirects(response, reverse('invoice_export_detail', args=[export.pk]))
+        status_url = reverse('invoice_export_status', args=[export.pk])
+        self.assertEqual(self.client.get(status_url).json()['status'], 'pending')
+        self.assertEqual(self.client.get(reverse('invoice_export_download', args=[export.pk])).status_code, 404)
+
+        self.assertEqual(run_invoice_exports(workers=1), 1)
+        download_url = reverse('invoice_export_download', args=[export.pk])
+        self.assertEqual(self.client.get(status_url).json(), {'status': 'done', 'url': download_url})
+        self.assertEqual(len(self.read_zip(self.client.get(download_url))), 3)
@@ -0,0 +1,97 @@
+# core/tests/test_invoice_numbers.py
+import threading
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from core.models import InvoiceSequence
+
+from .test_views import InvoiceTestCase
+
+
+class InvoiceSequenceTests(InvoiceTestCase):
+    def test_allocates_consecutive_numbers_per_user(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+
+        self.assertEqual(InvoiceSequence.allocate(self.user.pk), range(1, 2))
+        self.assertEqual(InvoiceSequence.allocate(self.user.pk, count=3), range(2, 5))
+        self.assertEqual(InvoiceSequence.allocate(other.pk), range(1, 2))
+        self.assertEqual(InvoiceSequence.allocate(self.user.pk), range(5, 6))
+
+    def test_invoices_are_numbered_in_creation_order(self):
+        numbers = [self.create_invoice(self.first_client).invoice_number for _ in range(3)]
+        self.assertEqual(numbers, ['INV-00001', 'INV-00002', 'INV-00003'])
+
+    def test_numbers_are_not_reused_after_delete(self):
+        self.create_invoice(self.first_client)
+        self.create_invoice(self.first_client).delete()
+
+        self.assertEqual(self.create_invoice(self.first_client).invoice_number, 'INV-00003')
+
+    def test_rolled_back_create_gives_its_number_back(self):
+        self.create_invoice(self.first_client)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.create_invoice(self.first_client)
+            raise RuntimeError('create failed')
+
+        self.assertEqual(self.create_invoice(self.first_client).invoice_number, 'INV-00002')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'INSERT ... ON CONFLICT allocation runs on PostgreSQL only')
+class ConcurrentAllocationTests(TransactionTestCase):
+    def test_concurrent_allocations_never_collide(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        numbers = []
+        start = threading.Barrier(8)
+
+        def allocate():
+            try:
+                start.wait()
+                for _ in range(25):
+                    numbers.extend(InvoiceSequence.allocate(user.pk))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(numbers), list(range(1, 201)))
+
+
+class BackfillMigrationTests(TransactionTestCase):
+    migrate_from = [('core', '0008_invoice_sent_modified_idx')]
+    migrate_to = [('core', '0009_invoicesequence')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_sequences_continue_from_existing_numbers(self):
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model('auth', 'User')
+        Client = apps.get_model('core', 'Client')
+        OldInvoice = apps.get_model('core', 'Invoice')
+        owner = User.objects.create(username='owner')
+        other = User.objects.create(username='other')
+        for user, numbers in ((owner, ['INV-00002', 'INV-00007', 'custom']), (other, ['INV-00001'])):
+            client = Client.objects.create(user_id=user.pk, name='Client')
+            for number in numbers:
+                OldInvoice.objects.create(user_id=user.pk, client=client, invoice_number=number, due_date='2026-11-01T00:00Z')
+
+        apps = self.migrate(self.migrate_to)
+        Sequence = apps.get_model('core', 'InvoiceSequence')
+        self.assertEqual(
+            dict(Sequence.objects.values_list('user_id', 'last_number')),
+            {owner.pk: 7, other.pk: 1},
+        )
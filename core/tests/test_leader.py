@@ -0,0 +1,137 @@
+# core/tests/test_leader.py
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core.leader import AdvisoryLock, FileLock, LeaderElection, fcntl, get_leader_lock
+
+INTERVAL = 0.05
+
+
+class Elector:
+    """A LeaderElection whose callbacks just record what happened."""
+
+    def __init__(self, lock, fail_on_elected=False):
+        self.elected = threading.Event()
+        self.deposed = threading.Event()
+        self.fail_on_elected = fail_on_elected
+        self.election = LeaderElection(self.on_elected, self.deposed.set, lock=lock, interval=INTERVAL)
+
+    def on_elected(self):
+        if self.fail_on_elected:
+            raise RuntimeError('scheduler failed to start')
+        self.elected.set()
+
+    def start(self):
+        self.election.start()
+        return self
+
+    def stop(self):
+        self.election.stop()
+        self.election.join(timeout=5)
+
+
+@unittest.skipIf(fcntl is None, 'flock is not available on this platform')
+class FileLockElectionTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'scheduler.lock')
+
+    def start_elector(self, **kwargs):
+        elector = Elector(FileLock(self.path), **kwargs).start()
+        self.addCleanup(elector.stop)
+        return elector
+
+    def test_lock_is_exclusive(self):
+        first, second = FileLock(self.path), FileLock(self.path)
+
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertFalse(second.is_held())
+
+        first.release()
+        self.assertFalse(first.is_held())
+        self.assertTrue(second.acquire())
+        second.release()
+
+    def test_second_elector_stays_follower(self):
+        with self.assertLogs('core.leader', 'INFO'):
+            leader = self.start_elector()
+            self.assertTrue(leader.elected.wait(5))
+
+        follower = self.start_elector()
+        time.sleep(INTERVAL * 5)
+
+        self.assertTrue(leader.election.is_leader)
+        self.assertFalse(follower.election.is_leader)
+        self.assertFalse(follower.elected.is_set())
+
+    def test_follower_takes_over_when_leader_stops(self):
+        with self.assertLogs('core.leader', 'INFO'):
+            leader = self.start_elector()
+            self.assertTrue(leader.elected.wait(5))
+        follower = self.start_elector()
+
+        with self.assertLogs('core.leader', 'INFO'):
+            leader.stop()
+            self.assertTrue(leader.deposed.is_set())
+            self.assertFalse(leader.election.is_leader)
+            self.assertTrue(follower.elected.wait(5))
+        self.assertTrue(follower.election.is_leader)
+
+    def test_failed_start_gives_up_the_lock(self):
+        with self.assertLogs('core.leader', 'ERROR'):
+            failing = self.start_elector(fail_on_elected=True)
+            time.sleep(INTERVAL * 2)
+            failing.stop()
+
+        self.assertFalse(failing.election.is_leader)
+        self.assertFalse(failing.deposed.is_set())
+        other = FileLock(self.path)
+        self.assertTrue(other.acquire())
+        other.release()
+
+    def test_get_leader_lock_uses_the_lock_file(self):
+        with override_settings(SCHEDULER_LOCK_FILE=self.path):
+            lock = get_leader_lock()
+
+        if connection.vendor == 'postgresql':
+            self.assertIsInstance(lock, AdvisoryLock)
+        else:
+            self.assertIsInstance(lock, FileLock)
+            self.assertEqual(lock.path, self.path)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'advisory locks need PostgreSQL')
+class AdvisoryLockElectionTests(TransactionTestCase):
+
+    def test_second_elector_stays_follower(self):
+        leader = Elector(AdvisoryLock(123_456)).start()
+        self.addCleanup(leader.stop)
+        self.assertTrue(leader.elected.wait(5))
+
+        follower = Elector(AdvisoryLock(123_456)).start()
+        self.addCleanup(follower.stop)
+        time.sleep(INTERVAL * 5)
+        self.assertFalse(follower.election.is_leader)
+
+        leader.stop()
+        self.assertTrue(follower.elected.wait(5))
+
+    def test_lock_is_freed_when_the_connection_drops(self):
+        first, second = AdvisoryLock(123_457), AdvisoryLock(123_457)
+        self.addCleanup(second.release)
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+
+        first.close()
+
+        self.assertTrue(second.acquire())
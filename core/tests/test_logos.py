@@ -0,0 +1,45 @@
+# core/tests/test_logos.py
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from core.logos import get_logo_reader, load_logo_reader, process_logo
+from core.models import BusinessProfile
+
+
+def make_logo(color, name='logo.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (600, 300), color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ProcessLogoTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        load_logo_reader.cache_clear()
+
+    def upload(self, profile, color):
+        profile.business_logo = make_logo(color)
+        process_logo(profile)
+        return get_logo_reader(profile)
+
+    def test_reupload_under_same_name_replaces_pdf_logo(self):
+        profile = BusinessProfile()
+        red = self.upload(profile, 'red')
+        red_name = profile.logo_pdf.name
+        blue = self.upload(profile, 'blue')
+
+        self.assertNotEqual(profile.logo_pdf.name, red_name)
+        self.assertFalse(profile.logo_pdf.storage.exists(red_name))
+        # First pixel as (red, green, blue); JPEG may shift the values slightly
+        self.assertGreater(red.getRGBData()[0], 200)
+        self.assertLess(blue.getRGBData()[0], 50)
+        self.assertGreater(blue.getRGBData()[2], 200)
@@ -0,0 +1,106 @@
+# core/tests/test_outbox.py
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import EmailOutbox
+from core.outbox import SEND_LEASE, get_backoff, send_queued_emails
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP server unavailable')
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-batch."""
+
+
+class CrashingBackend(EmailBackend):
+    """Delivers the first message, then dies; records the transaction depth at each send."""
+    savepoint_depths = []
+
+    def send_messages(self, messages):
+        CrashingBackend.savepoint_depths.append(len(connection.savepoint_ids))
+        if mail.outbox:
+            raise Crash()
+        return super().send_messages(messages)
+
+
+class SendQueuedEmailsTests(TestCase):
+    def queue(self, count=1):
+        return [
+            EmailOutbox.objects.create(
+                subject=f'Invoice {i}', body='Body', from_email='billing@acme.test', recipient=f'client{i}@example.com',
+            )
+            for i in range(count)
+        ]
+
+    def test_sends_pending_emails(self):
+        emails = self.queue(2)
+
+        self.assertEqual(send_queued_emails(), (2, 0))
+        self.assertEqual([message.to for message in mail.outbox], [[email.recipient] for email in emails])
+        for email in emails:
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('sent', 1))
+            self.assertIsNotNone(email.sent_at)
+
+    @override_settings(EMAIL_BACKEND='core.tests.test_outbox.FailingBackend')
+    def test_failed_send_is_retried_with_backoff(self):
+        with self.assertLogs('core.outbox', 'ERROR'):
+            email, = self.queue()
+            now = timezone.now()
+
+            self.assertEqual(send_queued_emails(now=now), (0, 0))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertEqual(email.next_attempt_at, now + get_backoff(1))
+            self.assertEqual(email.last_error, 'SMTP server unavailable')
+
+            # Not due again until the backoff has passed
+            self.assertEqual(send_queued_emails(now=now + timedelta(seconds=1)), (0, 0))
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 1)
+
+            later = email.next_attempt_at
+            send_queued_emails(now=later)
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 2)
+            self.assertEqual(email.next_attempt_at, later + get_backoff(2))
+
+    @override_settings(EMAIL_BACKEND='core.tests.test_outbox.FailingBackend')
+    def test_marked_failed_after_max_attempts(self):
+        with self.assertLogs('core.outbox', 'ERROR'):
+            email, = self.queue()
+            now = timezone.now()
+
+            for _ in range(2):
+                self.assertEqual(send_queued_emails(max_attempts=3, now=now), (0, 0))
+                email.refresh_from_db()
+                now = email.next_attempt_at
+            self.assertEqual(send_queued_emails(max_attempts=3, now=now), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('failed', 3))
+
+    @override_settings(EMAIL_BACKEND='core.tests.test_outbox.CrashingBackend')
+    def test_crash_keeps_recorded_sends(self):
+        first, second = self.queue(2)
+        now = timezone.now()
+        CrashingBackend.savepoint_depths = []
+        baseline = len(connection.savepoint_ids)
+
+        with self.assertRaises(Crash):
+            send_queued_emails(now=now)
+
+        # Sends happen outside any transaction opened by the sender
+        self.assertEqual(CrashingBackend.savepoint_depths, [baseline, baseline])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'sent')
+        # The message in flight stays leased, then is tried again
+        self.assertEqual((second.status, second.next_attempt_at), ('pending', now + SEND_LEASE))
@@ -0,0 +1,120 @@
+# core/tests/test_overdue.py
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.utils import timezone
+
+from core.models import Invoice
+from core.overdue import OverdueTimer
+
+from .test_views import InvoiceTestCase
+
+
+class OverdueTimerTests(InvoiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.timer = OverdueTimer(refresh_interval=60, horizon=24 * 60 * 60)
+
+    def create_sent_invoice(self, due_in, status='sent'):
+        return Invoice.objects.create(
+            user=self.user, client=self.first_client, status=status,
+            due_date=self.now + due_in, subtotal=Decimal('100.00'),
+        )
+
+    def test_first_refresh_loads_past_due_and_horizon(self):
+        past_due = self.create_sent_invoice(timedelta(days=-3))
+        due_soon = self.create_sent_invoice(timedelta(hours=2))
+        self.create_sent_invoice(timedelta(days=3))
+        self.create_sent_invoice(timedelta(hours=2), status='draft')
+        self.create_sent_invoice(timedelta(hours=-2), status='paid')
+
+        self.timer.refresh(self.now)
+
+        self.assertEqual(self.timer.due_dates, {
+            past_due.pk: past_due.due_date,
+            due_soon.pk: due_soon.due_date,
+        })
+        self.assertEqual(self.timer.loaded_until, self.now + timedelta(days=1))
+
+    def test_refresh_extends_the_horizon(self):
+        later = self.create_sent_invoice(timedelta(hours=30))
+        self.timer.refresh(self.now)
+        self.assertNotIn(later.pk, self.timer.due_dates)
+
+        self.timer.refresh(self.now + timedelta(hours=10))
+
+        self.assertEqual(self.timer.due_dates[later.pk], later.due_date)
+
+    def test_refresh_picks_up_changed_invoices(self):
+        invoice = self.create_sent_invoice(timedelta(days=3))
+        self.timer.refresh(self.now)
+
+        invoice.due_date = self.now + timedelta(hours=1)
+        invoice.save()
+        self.timer.refresh(self.now + timedelta(seconds=60))
+
+        self.assertEqual(self.timer.due_dates[invoice.pk], invoice.due_date)
+
+    def test_fire_marks_due_invoices(self):
+        past_due = self.create_sent_invoice(timedelta(days=-3))
+        due_soon = self.create_sent_invoice(timedelta(hours=2))
+        not_due = self.create_sent_invoice(timedelta(hours=5))
+        self.timer.refresh(self.now)
+
+        with self.assertLogs('core.overdue', 'INFO'):
+            self.assertEqual(self.timer.fire(self.now), 1)
+            self.assertEqual(self.timer.fire(self.now + timedelta(hours=3)), 1)
+
+        self.assertEqual(
+            set(Invoice.objects.filter(status='overdue').values_list('pk', flat=True)),
+            {past_due.pk, due_soon.pk},
+        )
+        self.assertEqual(list(self.timer.due_dates), [not_due.pk])
+
+    def test_fire_rechecks_the_database(self):
+        paid = self.create_sent_invoice(timedelta(hours=1))
+        moved = self.create_sent_invoice(timedelta(hours=1))
+        self.timer.refresh(self.now)
+
+        Invoice.objects.filter(pk=paid.pk).set_status('paid')
+        moved.due_date = self.now + timedelta(hours=4)
+        moved.save()
+        self.timer.refresh(self.now + timedelta(seconds=60))
+
+        self.assertEqual(self.timer.fire(self.now + timedelta(hours=2)), 0)
+        self.assertEqual(Invoice.objects.get(pk=paid.pk).status, 'paid')
+        # The stale heap entry for the old due date is dropped, the new one kept
+        self.assertEqual(self.timer.due_dates, {moved.pk: moved.due_date})
+
+        with self.assertLogs('core.overdue', 'INFO'):
+            self.assertEqual(self.timer.fire(self.now + timedelta(hours=5)), 1)
+
+    def test_saving_a_sent_invoice_wakes_running_timers(self):
+        with mock.patch('core.overdue._running_timers', {self.timer}):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_sent_invoice(timedelta(hours=1), status='draft')
+            self.assertFalse(self.timer._wakeup.is_set())
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_sent_invoice(timedelta(hours=1))
+            self.assertTrue(self.timer._wakeup.is_set())
+
+    def test_wake_refreshes_before_the_interval(self):
+        refreshed = threading.Semaphore(0)
+        timer = OverdueTimer(refresh_interval=3600)
+
+        with mock.patch.object(timer, 'refresh', side_effect=lambda now: refreshed.release()), \
+                mock.patch.object(timer, 'fire', return_value=0):
+            timer.start()
+            try:
+                self.assertTrue(refreshed.acquire(timeout=5))
+                timer.wake()
+                self.assertTrue(refreshed.acquire(timeout=5))
+            finally:
+                timer.stop()
+                timer.join(timeout=5)
+        self.assertFalse(timer.is_alive())
@@ -0,0 +1,112 @@
+# core/tests/test_pdf.py
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+
+from core.management.commands.benchmark_pdf import Command as BenchmarkCommand
+from core.models import Invoice
+from core.pdf import (
+    InvoiceRenderer, PDF_CACHE_DIR, delete_cached_pdfs, get_invoice_pdf_cache_key, get_or_render_invoice_pdf,
+)
+
+from .test_views import InvoiceTestCase
+
+
+class InvoiceRendererTests(SimpleTestCase):
+    def render(self, item_count):
+        invoice, profile = BenchmarkCommand().sample_invoice(item_count)
+        items = list(BenchmarkCommand().sample_items(item_count))
+        output = BytesIO()
+        InvoiceRenderer(invoice, profile, items).render(output)
+        return output.getvalue()
+
+    def test_renders_same_invoice_twice_in_one_thread(self):
+        # These lengths split the items table across pages at different points
+        for item_count in (27, 32, 50, 55, 73, 78):
+            with self.subTest(items=item_count):
+                first = self.render(item_count)
+                second = self.render(item_count)
+                self.assertTrue(first.startswith(b'%PDF'))
+                self.assertTrue(second.startswith(b'%PDF'))
+                self.assertEqual(len(first), len(second))
+
+
+class PdfCacheTests(InvoiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.profile = self.user.business_profile
+        self.invoice = self.create_invoice(self.first_client, item_count=3)
+        render = mock.patch.object(InvoiceRenderer, 'render', autospec=True, side_effect=InvoiceRenderer.render)
+        self.render = render.start()
+        self.addCleanup(render.stop)
+
+    def get_pdf(self):
+        invoice = Invoice.objects.select_related('client').get(pk=self.invoice.pk)
+        return get_or_render_invoice_pdf(invoice, self.profile)
+
+    def cached_names(self):
+        return default_storage.listdir(f'{PDF_CACHE_DIR}/{self.invoice.pk}')[1]
+
+    def test_cache_hit_skips_rendering(self):
+        path = self.get_pdf()
+        self.assertEqual(self.render.call_count, 1)
+        with default_storage.open(path) as stored:
+            self.assertTrue(stored.read().startswith(b'%PDF'))
+
+        self.assertEqual(self.get_pdf(), path)
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_item_edit_changes_the_key(self):
+        old_key = get_invoice_pdf_cache_key(self.invoice, self.profile)
+
+        item = self.invoice.items.first()
+        item.unit_price = Decimal('99.00')
+        item.save()
+
+        self.assertNotEqual(get_invoice_pdf_cache_key(self.invoice, self.profile), old_key)
+
+    def test_new_render_replaces_old_files(self):
+        old_path = self.get_pdf()
+        item = self.invoice.items.first()
+        item.description = 'Changed'
+        item.save()
+
+        new_path = self.get_pdf()
+
+        self.assertNotEqual(new_path, old_path)
+        self.assertEqual(self.render.call_count, 2)
+        self.assertFalse(default_storage.exists(old_path))
+        self.assertEqual(self.cached_names(), [new_path.rsplit('/', 1)[1]])
+
+    def test_delete_cached_pdfs(self):
+        path = self.get_pdf()
+        default_storage.save(f'{PDF_CACHE_DIR}/{self.invoice.pk}/stale.pdf', BytesIO(b'%PDF'))
+
+        delete_cached_pdfs(self.invoice.pk, keep=path)
+        self.assertEqual(self.cached_names(), [path.rsplit('/', 1)[1]])
+
+        delete_cached_pdfs(self.invoice.pk)
+        self.assertEqual(self.cached_names(), [])
+
+    def test_deleting_the_invoice_removes_its_pdfs(self):
+        path = self.get_pdf()
+
+        self.invoice.delete()
+
+        self.assertFalse(default_storage.exists(path))
+
+    def test_nothing_cached(self):
+        # A missing directory is not an error
+        delete_cached_pdfs(self.invoice.pk)
@@ -0,0 +1,79 @@
+# core/tests/test_pdf_jobs.py
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.admin import InvoiceAdmin
+from core.models import Invoice, PdfRenderJob
+from core.pdf_jobs import enqueue_pdf_render
+
+from .test_views import InvoiceTestCase
+
+
+@override_settings(PDF_ASYNC_MIN_ITEMS=3)
+class PdfRenderJobViewTests(InvoiceTestCase):
+    def get_without_loading_items(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        item_queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT "core_invoiceitem"')
+        ]
+        self.assertEqual(item_queries, [])
+        return response
+
+    def test_status_reads_only_the_job(self):
+        invoice = self.create_invoice(self.first_client, item_count=10)
+        enqueue_pdf_render(invoice)
+        url = reverse('invoice_pdf_status', args=[invoice.pk])
+
+        response = self.get_without_loading_items(url)
+        self.assertEqual(response.json(), {'status': 'pending', 'url': None})
+
+        PdfRenderJob.objects.filter(invoice=invoice).update(status='done')
+        response = self.get_without_loading_items(url)
+        self.assertEqual(response.json(), {'status': 'ready', 'url': reverse('invoice_pdf', args=[invoice.pk])})
+
+    def test_status_missing_when_the_job_is_gone(self):
+        invoice = self.create_invoice(self.first_client, item_count=10)
+        response = self.client.get(reverse('invoice_pdf', args=[invoice.pk]))
+        self.assertContains(response, 'id="pdf-missing"', status_code=202)
+
+        PdfRenderJob.objects.filter(invoice=invoice).delete()
+        response = self.client.get(reverse('invoice_pdf_status', args=[invoice.pk]))
+        self.assertEqual(response.json(), {'status': 'missing', 'url': None})
+
+        # The pending page's Try Again link queues the render again
+        self.client.get(reverse('invoice_pdf', args=[invoice.pk]))
+        self.assertEqual(PdfRenderJob.objects.get(invoice=invoice).status, 'pending')
+
+    def test_download_waits_for_queued_render_without_loading_items(self):
+        invoice = self.create_invoice(self.first_client, item_count=10)
+        enqueue_pdf_render(invoice)
+
+        response = self.get_without_loading_items(reverse('invoice_pdf', args=[invoice.pk]))
+        self.assertEqual(response.status_code, 202)
+
+    def test_download_queues_render_for_long_invoice(self):
+        invoice = self.create_invoice(self.first_client, item_count=10)
+
+        response = self.client.get(reverse('invoice_pdf', args=[invoice.pk]))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(PdfRenderJob.objects.get(invoice=invoice).status, 'pending')
+
+
+class MarkAsSentTests(InvoiceTestCase):
+    def test_queues_render_for_each_newly_sent_invoice(self):
+        draft = self.create_invoice(self.first_client, status='draft')
+        sent = self.create_invoice(self.first_client, status='sent')
+        request = RequestFactory().post('/')
+        request.user = self.user
+
+        admin = InvoiceAdmin(Invoice, site)
+        admin.message_user = lambda request, message: None
+        admin.mark_as_sent(request, Invoice.objects.filter(pk__in=[draft.pk, sent.pk]))
+
+        self.assertEqual(Invoice.objects.get(pk=draft.pk).status, 'sent')
+        self.assertEqual(list(PdfRenderJob.objects.values_list('invoice_id', flat=True)), [draft.pk])
@@ -0,0 +1,212 @@
+# core/tests/test_stats.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from core.models import Invoice, UserInvoiceStats
+
+from .test_views import InvoiceTestCase
+
+
+class StatsTestCase(InvoiceTestCase):
+    """Compares the incrementally maintained UserInvoiceStats with a full rebuild."""
+
+    def create_billed_invoice(self, client, subtotal='100.00', status='sent', currency='USD', due_in_days=30):
+        return Invoice.objects.create(
+            user=self.user, client=client, status=status, currency=currency,
+            due_date=timezone.now() + timedelta(days=due_in_days),
+            subtotal=Decimal(subtotal), tax_rate=Decimal('10'),
+        )
+
+    def read_stats(self):
+        # Buckets emptied by decrements are left behind at zero; rebuild() drops them
+        return {
+            (row.user_id, row.status, row.currency): (row.invoice_count, row.total_amount)
+            for row in UserInvoiceStats.objects.all()
+            if row.invoice_count or row.total_amount
+        }
+
+    def assertStatsMatchRebuild(self):
+        incremental = self.read_stats()
+        UserInvoiceStats.rebuild()
+        self.assertEqual(incremental, self.read_stats())
+
+
+class MarkOverdueTests(StatsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.later = timezone.now() + timedelta(days=60)
+
+    def test_updates_past_due_sent_invoices(self):
+        second_client = self.create_client()
+        due = [
+            self.create_billed_invoice(self.first_client, '100.00'),
+            self.create_billed_invoice(second_client, '40.00', currency='EUR'),
+            self.create_billed_invoice(second_client, '15.50'),
+        ]
+        self.create_billed_invoice(self.first_client, status='draft')
+        self.create_billed_invoice(self.first_client, status='paid')
+        not_due = self.create_billed_invoice(self.first_client, due_in_days=90)
+
+        self.assertEqual(Invoice.objects.mark_overdue(now=self.later), 3)
+
+        self.assertEqual(
+            set(Invoice.objects.filter(status='overdue').values_list('pk', flat=True)),
+            {invoice.pk for invoice in due},
+        )
+        not_due.refresh_from_db()
+        self.assertEqual(not_due.status, 'sent')
+        self.assertEqual(
+            UserInvoiceStats.objects.get(user=self.user, status='overdue', currency='USD').total_amount,
+            Decimal('127.05'),
+        )
+        self.assertStatsMatchRebuild()
+
+    def test_chunks(self):
+        invoices = [self.create_billed_invoice(self.first_client, f'{10 * (i + 1)}.00') for i in range(5)]
+        chunks = []
+
+        updated = Invoice.objects.mark_overdue(now=self.later, chunk_size=2, on_chunk=chunks.append)
+
+        self.assertEqual(updated, 5)
+        self.assertEqual([len(rows) for rows in chunks], [2, 2, 1])
+        self.assertEqual(
+            sorted(row for rows in chunks for row in rows),
+            [(invoice.pk, self.user.pk, 'USD', invoice.total_amount) for invoice in invoices],
+        )
+        self.assertStatsMatchRebuild()
+
+    def test_exact_multiple_of_chunk_size(self):
+        for _ in range(4):
+            self.create_billed_invoice(self.first_client)
+        chunks = []
+
+        self.assertEqual(Invoice.objects.mark_overdue(now=self.later, chunk_size=2, on_chunk=chunks.append), 4)
+
+        # The final empty chunk ends the loop without reaching on_chunk
+        self.assertEqual([len(rows) for rows in chunks], [2, 2])
+        self.assertStatsMatchRebuild()
+
+    def test_nothing_due(self):
+        self.create_billed_invoice(self.first_client)
+        chunks = []
+
+        self.assertEqual(Invoice.objects.mark_overdue(on_chunk=chunks.append), 0)
+
+        self.assertEqual(chunks, [])
+        self.assertStatsMatchRebuild()
+
+    def test_sets_last_modified(self):
+        invoice = self.create_billed_invoice(self.first_client)
+
+        Invoice.objects.mark_overdue(now=self.later)
+
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.last_modified_timestamp, self.later)
+
+    def test_repeat_run_is_a_no_op(self):
+        self.create_billed_invoice(self.first_client)
+        Invoice.objects.mark_overdue(now=self.later)
+        before = self.read_stats()
+
+        self.assertEqual(Invoice.objects.mark_overdue(now=self.later), 0)
+
+        self.assertEqual(self.read_stats(), before)
+        self.assertStatsMatchRebuild()
+
+
+class InvoiceStatsSignalTests(StatsTestCase):
+    """The Invoice signals and bulk transitions must leave the same stats a rebuild would."""
+
+    def setUp(self):
+        super().setUp()
+        self.invoice = self.create_billed_invoice(self.first_client, '100.00')
+        self.create_billed_invoice(self.first_client, '30.00', currency='EUR', status='paid')
+
+    def test_create(self):
+        self.create_billed_invoice(self.create_client(), '12.34', status='draft')
+
+        self.assertEqual(
+            UserInvoiceStats.objects.get(user=self.user, status='sent', currency='USD').total_amount,
+            Decimal('110.00'),
+        )
+        self.assertStatsMatchRebuild()
+
+    def test_edit_status(self):
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        invoice.status = 'paid'
+        invoice.save()
+
+        self.assertStatsMatchRebuild()
+
+    def test_edit_total(self):
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        invoice.subtotal = Decimal('250.00')
+        invoice.save()
+
+        self.assertStatsMatchRebuild()
+
+    def test_edit_currency(self):
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        invoice.currency = 'EUR'
+        invoice.save()
+
+        self.assertStatsMatchRebuild()
+
+    def test_edit_deferred_instance(self):
+        # Without every stats field loaded, pre_save has to read the stored key
+        invoice = Invoice.objects.only('pk', 'status').get(pk=self.invoice.pk)
+        invoice.status = 'overdue'
+        invoice.save()
+
+        self.assertStatsMatchRebuild()
+
+    def test_repeated_saves(self):
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        for status, subtotal in (('paid', '80.00'), ('sent', '90.00'), ('overdue', '90.00')):
+            invoice.status = status
+            invoice.subtotal = Decimal(subtotal)
+            invoice.save()
+
+        self.assertStatsMatchRebuild()
+
+    def test_delete(self):
+        Invoice.objects.get(pk=self.invoice.pk).delete()
+
+        self.assertStatsMatchRebuild()
+
+    def test_queryset_delete(self):
+        Invoice.objects.filter(user=self.user, currency='USD').delete()
+
+        self.assertStatsMatchRebuild()
+
+    def test_set_status(self):
+        self.create_billed_invoice(self.first_client, '20.00', status='draft')
+
+        updated = Invoice.objects.filter(user=self.user).set_status('paid')
+
+        # The invoice that was already paid is left alone
+        self.assertEqual(updated, 2)
+        self.assertStatsMatchRebuild()
+
+    def test_recalculate_totals(self):
+        self.create_invoice(self.first_client, item_count=3)
+
+        Invoice.objects.filter(user=self.user).recalculate_totals()
+
+        self.assertStatsMatchRebuild()
+
+    def test_client_cascade_delete(self):
+        second_client = self.create_client()
+        self.create_billed_invoice(second_client, '60.00')
+        self.create_billed_invoice(second_client, '5.00', status='overdue')
+
+        self.first_client.delete()
+
+        self.assertStatsMatchRebuild()
+        self.assertEqual(
+            UserInvoiceStats.objects.get(user=self.user, status='sent', currency='USD').total_amount,
+            Decimal('66.00'),
+        )
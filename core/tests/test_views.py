@@ -0,0 +1,167 @@
+# core/tests/test_views.py
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import BusinessProfile, Client, Invoice, InvoiceItem
+
+ADDRESS = {
+    'street_address': '1 Main St',
+    'city': 'Springfield',
+    'state_province': 'IL',
+    'zip_postal_code': '62701',
+    'country': 'US',
+}
+
+
+class InvoiceTestCase(TestCase):
+    """Logged-in owner with a business profile and one client."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        BusinessProfile.objects.create(
+            user=self.user, business_name='Acme', business_email='billing@acme.test',
+            phone_number='555-0100', **ADDRESS,
+        )
+        self.client.force_login(self.user)
+        self.first_client = self.create_client()
+
+    def create_client(self):
+        number = Client.objects.count() + 1
+        return Client.objects.create(
+            user=self.user, name=f'Client {number}', email=f'client{number}@example.com',
+            phone='555-0101', **ADDRESS,
+        )
+
+    def create_invoice(self, client, item_count=1, status='sent'):
+        invoice = Invoice.objects.create(
+            user=self.user, client=client, status=status,
+            due_date=timezone.now() + timedelta(days=30), tax_rate=Decimal('10'),
+        )
+        InvoiceItem.objects.bulk_create(
+            InvoiceItem(invoice=invoice, description=f'Item {i}', quantity=Decimal('2'), unit_price=Decimal('12.50'))
+            for i in range(item_count)
+        )
+        return invoice
+
+
+class QueryCountTests(InvoiceTestCase):
+    """Page query counts must not grow with the number of invoices, items or clients."""
+
+    def assertPageQueries(self, num, url):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_invoice_list(self):
+        self.create_invoice(self.first_client)
+        self.assertPageQueries(5, reverse('invoice_list'))
+
+        for status in ('draft', 'sent', 'paid', 'overdue'):
+            self.create_invoice(self.create_client(), item_count=5, status=status)
+        self.assertPageQueries(5, reverse('invoice_list'))
+
+    def test_invoice_detail(self):
+        invoice = self.create_invoice(self.first_client)
+        self.assertPageQueries(5, reverse('invoice_detail', args=[invoice.pk]))
+
+        invoice = self.create_invoice(self.first_client, item_count=40)
+        self.assertPageQueries(5, reverse('invoice_detail', args=[invoice.pk]))
+
+    def test_client_detail(self):
+        self.create_invoice(self.first_client)
+        self.assertPageQueries(4, reverse('client_detail', args=[self.first_client.pk]))
+
+        for status in ('draft', 'sent', 'paid', 'overdue'):
+            self.create_invoice(self.first_client, item_count=5, status=status)
+        self.assertPageQueries(4, reverse('client_detail', args=[self.first_client.pk]))
+
+
+class InvoiceEditTests(InvoiceTestCase):
+    def post_items(self, invoice, items):
+        data = {
+            'client': self.first_client.pk, 'invoice_date': '2026-10-01', 'due_date': '2026-11-01',
+            'status': invoice.status, 'currency': 'USD', 'tax_rate': '10', 'discount_amount': '0', 'notes': '',
+            'items-TOTAL_FORMS': str(len(items)), 'items-INITIAL_FORMS': str(len(items)),
+            'items-MIN_NUM_FORMS': '0', 'items-MAX_NUM_FORMS': '1000',
+        }
+        for index, (pk, description) in enumerate(items):
+            data.update({
+                f'items-{index}-id': pk, f'items-{index}-description': description,
+                f'items-{index}-quantity': '1', f'items-{index}-unit_price': '5',
+            })
+        return self.client.post(reverse('invoice_edit', args=[invoice.pk]), data)
+
+    def test_updates_existing_items(self):
+        invoice = self.create_invoice(self.first_client, item_count=3, status='draft')
+        pks = list(invoice.items.values_list('pk', flat=True))
+
+        response = self.post_items(invoice, [(pk, f'Edited {pk}') for pk in pks])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(invoice.items.order_by('pk').values_list('description', flat=True)),
+            [f'Edited {pk}' for pk in pks],
+        )
+
+    def test_rejects_item_of_another_invoice(self):
+        invoice = self.create_invoice(self.first_client, status='draft')
+        other_item = self.create_invoice(self.first_client).items.get()
+
+        response = self.post_items(invoice, [(other_item.pk, 'Stolen')])
+        self.assertEqual(response.status_code, 200)
+        other_item.refresh_from_db()
+        self.assertEqual(other_item.description, 'Item 0')
+
+
+class ConditionalGetTests(InvoiceTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.invoice = self.create_invoice(self.first_client, item_count=2)
+
+    def assertRevalidates(self, url):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Bulk item edits do not touch the invoice row
+        self.invoice.items.update(description='Changed')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_etag_follows_item_changes(self):
+        self.assertRevalidates(reverse('invoice_detail', args=[self.invoice.pk]))
+
+    def test_detail_etag_follows_due_time(self):
+        now = timezone.now()
+        draft = Invoice.objects.create(
+            user=self.user, client=self.first_client, status='draft', due_date=now + timedelta(hours=2),
+        )
+        url = reverse('invoice_detail', args=[draft.pk])
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            etag = self.client.get(url)['ETag']
+
+        # Past the due time the draft shows as expired, even on the same day
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(hours=3)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_pdf_etag_follows_item_changes(self):
+        self.assertRevalidates(reverse('invoice_pdf', args=[self.invoice.pk]))
+
+    def test_pdf_ignores_if_modified_since_alone(self):
+        url = reverse('invoice_pdf', args=[self.invoice.pk])
+        self.assertNotIn('Last-Modified', self.client.get(url))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
@@ -34,12 +34,17 @@ urlpatterns = [
     
     # Invoices
     path('invoices/', views.invoice_list, name='invoice_list'),
+    path('invoices/export/', views.invoice_export, name='invoice_export'),
+    path('invoices/exports/<int:pk>/', views.invoice_export_detail, name='invoice_export_detail'),
+    path('invoices/exports/<int:pk>/status/', views.invoice_export_status, name='invoice_export_status'),
+    path('invoices/exports/<int:pk>/download/', views.invoice_export_download, name='invoice_export_download'),
     path('invoices/create/', views.invoice_create, name='invoice_create'),
     path('invoices/<int:pk>/edit/', views.invoice_edit, name='invoice_edit'),
     path('invoices/<int:pk>/delete/', views.invoice_delete, name='invoice_delete'),
     path('invoices/<int:pk>/', views.invoice_detail, name='invoice_detail'),
     path('invoices/<int:pk>/confirmation/', views.invoice_confirmation, name='invoice_confirmation'),
     path('invoices/<int:pk>/pdf/', views.invoice_pdf, name='invoice_pdf'),
+    path('invoices/<int:pk>/pdf/status/', views.invoice_pdf_status, name='invoice_pdf_status'),
     
     # Ad Tracking
     path('track-ad/', views.track_ad_click, name='track_ad_click'),
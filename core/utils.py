@@ -1,35 +1,261 @@
 ﻿from decimal import Decimal
+from datetime import datetime
+import base64
 import requests
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_RIGHT, TA_CENTER
-from io import BytesIO
-import os
-
-def convert_currency(amount, from_currency, to_currency):
-    if from_currency == to_currency:
-        return Decimal(str(amount))
-    FALLBACK_RATES = {'USD': 1.0, 'EUR': 0.92, 'GBP': 0.79, 'JPY': 149.50, 'AUD': 1.53, 'CAD': 1.36, 'CHF': 0.88, 'CNY': 7.24, 'INR': 83.12, 'PHP': 56.50}
+import logging
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CURRENCY_CHOICES, ExchangeRate, ExchangeRateTable
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_RATE_API_URL = "https://api.exchangerate-api.com/v4/latest/{base}"
+FALLBACK_RATES = {'USD': 1.0, 'EUR': 0.92, 'GBP': 0.79, 'JPY': 149.50, 'AUD': 1.53, 'CAD': 1.36, 'CHF': 0.88, 'CNY': 7.24, 'INR': 83.12, 'PHP': 56.50}
+SUPPORTED_CURRENCIES = [code for code, _ in CURRENCY_CHOICES]
+
+# Rate tables kept in process memory: base currency -> (rates, loaded_at)
+_rate_tables = {}
+# Seconds before looking for a snapshot again when none was stored yet, e.g. until the
+# scheduler's first refresh after a deploy has run
+MISSING_RATE_TABLE_RETRY = 60
+# Snapshots for past dates never change: (base currency, rate date) -> rates
+_historical_rate_tables = {}
+
+
+def _fetch_rate_table(base_currency):
+    """Download the full rate table for base_currency. Returns None on failure."""
     try:
-        url = f"https://api.exchangerate-api.com/v4/latest/{from_currency}"
-        response = requests.get(url, timeout=2)
+        response = requests.get(EXCHANGE_RATE_API_URL.format(base=base_currency), timeout=2)
         if response.status_code == 200:
-            data = response.json()
-            if to_currency in data['rates']:
-                return Decimal(str(amount * data['rates'][to_currency]))
-    except:
-        pass
+            return {code: Decimal(str(rate)) for code, rate in response.json()['rates'].items()}
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.warning(f"Error fetching {base_currency} exchange rates: {e}")
+    return None
+
+
+def refresh_exchange_rates():
+    """
+    Fetch rate tables for every supported currency and snapshot them.
+    Called by the scheduler - request-path code only reads the stored snapshots.
+    Returns the number of currency pairs stored.
+    """
+    now = timezone.now()
+    snapshot = []
+
+    for base_currency in SUPPORTED_CURRENCIES:
+        rates = _fetch_rate_table(base_currency)
+        if rates is None:
+            continue
+
+        ExchangeRateTable.objects.update_or_create(
+            base_currency=base_currency,
+            defaults={
+                'rates': {code: str(rate) for code, rate in rates.items()},
+                'fetched_at': now,
+            }
+        )
+        _rate_tables[base_currency] = (rates, now)
+
+        for quote_currency in SUPPORTED_CURRENCIES:
+            if quote_currency != base_currency and quote_currency in rates:
+                snapshot.append(ExchangeRate(
+                    rate_date=now.date(),
+                    base_currency=base_currency,
+                    quote_currency=quote_currency,
+                    rate=rates[quote_currency],
+                ))
+
+    ExchangeRate.objects.bulk_create(
+        snapshot,
+        update_conflicts=True,
+        unique_fields=['rate_date', 'base_currency', 'quote_currency'],
+        update_fields=['rate', 'fetched_at'],
+    )
+    return len(snapshot)
+
+
+def _historical_rate_table(base_currency, on_date):
+    """Return the latest snapshot for base_currency taken on or before on_date."""
+    rate_date = ExchangeRate.objects.filter(
+        base_currency=base_currency, rate_date__lte=on_date
+    ).order_by('-rate_date').values_list('rate_date', flat=True).first()
+    if rate_date is None:
+        return None
+
+    key = (base_currency, rate_date)
+    if key in _historical_rate_tables:
+        return _historical_rate_tables[key]
+
+    rates = dict(
+        ExchangeRate.objects.filter(base_currency=base_currency, rate_date=rate_date)
+        .values_list('quote_currency', 'rate')
+    )
+    if rate_date < timezone.now().date():
+        _historical_rate_tables[key] = rates
+    return rates
+
+
+def get_rate_table(base_currency, on_date=None):
+    """
+    Return {currency: Decimal rate} for base_currency, or None if unavailable.
+    - Never touches the network; rates come from the stored snapshots
+    - The latest table is kept in process memory and re-read after the TTL;
+      a missing table is looked for again after MISSING_RATE_TABLE_RETRY seconds
+    - Pass on_date to convert at the rates in effect on that date
+    """
     try:
-        if from_currency in FALLBACK_RATES and to_currency in FALLBACK_RATES:
-            amount_in_usd = float(amount) / FALLBACK_RATES[from_currency]
-            return Decimal(str(amount_in_usd * FALLBACK_RATES[to_currency]))
-    except:
-        pass
+        if on_date is not None:
+            return _historical_rate_table(base_currency, on_date)
+
+        cached = _rate_tables.get(base_currency)
+        now = timezone.now()
+        ttl = MISSING_RATE_TABLE_RETRY if cached is None or cached[0] is None else settings.EXCHANGE_RATE_CACHE_TTL
+        if cached is None or (now - cached[1]).total_seconds() > ttl:
+            stored = ExchangeRateTable.objects.filter(base_currency=base_currency).first()
+            rates = {code: Decimal(rate) for code, rate in stored.rates.items()} if stored else None
+            cached = (rates, now)
+            _rate_tables[base_currency] = cached
+        return cached[0]
+    except DatabaseError as e:
+        logger.warning(f"Error loading {base_currency} exchange rates: {e}")
+        return None
+
+
+PIVOT_CURRENCY = 'USD'
+CENT = Decimal('0.01')
+
+# Rate matrices kept in process memory: on_date -> RateMatrix
+_rate_matrices = {}
+
+
+def _to_decimal(amount):
+    if isinstance(amount, Decimal):
+        return amount
     return Decimal(str(amount))
 
+
+class RateMatrix:
+    """
+    Precomputed N x N cross rates between the supported currencies.
+    All rates are derived from a single pivot table, so conversions are
+    consistent with each other and stay in exact Decimal arithmetic.
+    """
+
+    def __init__(self, pivot_rates=None):
+        self.source = pivot_rates
+        pivot = {code: Decimal(str(rate)) for code, rate in FALLBACK_RATES.items()}
+        if pivot_rates:
+            pivot.update({code: rate for code, rate in pivot_rates.items() if code in pivot})
+
+        self.rates = {
+            from_currency: {
+                to_currency: pivot[to_currency] / pivot[from_currency]
+                for to_currency in pivot
+            }
+            for from_currency in pivot
+        }
+
+    def rate(self, from_currency, to_currency):
+        if from_currency == to_currency:
+            return Decimal('1')
+        return self.rates.get(from_currency, {}).get(to_currency)
+
+    def convert(self, amount, from_currency, to_currency):
+        """Convert a single amount. Unknown currencies are returned unchanged."""
+        amount = _to_decimal(amount)
+        rate = self.rate(from_currency, to_currency)
+        if rate is None:
+            return amount
+        return amount * rate
+
+    def convert_many(self, amounts, to_currency):
+        """Convert (amount, currency) pairs. Returns the converted amounts in order."""
+        return [self.convert(amount, currency, to_currency) for amount, currency in amounts]
+
+    def total(self, amounts, to_currency):
+        """
+        Sum many amounts in to_currency, rounded to cents once at the end.
+        Accepts a dict of currency -> amount or an iterable of (amount, currency) pairs.
+        """
+        if isinstance(amounts, dict):
+            amounts = [(amount, currency) for currency, amount in amounts.items()]
+        return sum(self.convert_many(amounts, to_currency), Decimal('0')).quantize(CENT)
+
+
+def get_rate_matrix(on_date=None):
+    """Return the RateMatrix for the latest (or on_date) snapshot, rebuilt only when rates change."""
+    pivot_rates = get_rate_table(PIVOT_CURRENCY, on_date)
+    matrix = _rate_matrices.get(on_date)
+    if matrix is None or matrix.source is not pivot_rates:
+        matrix = RateMatrix(pivot_rates)
+        _rate_matrices[on_date] = matrix
+    return matrix
+
+
+def convert_currency(amount, from_currency, to_currency, on_date=None):
+    return get_rate_matrix(on_date).convert(amount, from_currency, to_currency)
+
+
+def convert_amounts(amounts, to_currency, on_date=None):
+    """Batch conversion: total a dict of currency -> amount (or amount/currency pairs) in to_currency."""
+    return get_rate_matrix(on_date).total(amounts, to_currency)
+
+INVOICE_PAGE_SIZE = 25
+
+
+def encode_cursor(invoice):
+    value = f"{invoice.created_timestamp.isoformat()}|{invoice.pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_timestamp, pk) for a cursor. Raises ValueError if it is malformed."""
+    timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(timestamp), int(pk)
+
+
+def keyset_page(queryset, after=None, before=None, page_size=INVOICE_PAGE_SIZE):
+    """
+    Page through invoices newest-first on (created_timestamp, id).
+    Each page seeks from the cursor instead of using OFFSET, so page N costs the same as page 1.
+    Returns (items, previous_cursor, next_cursor); cursors are None at either end.
+    """
+    try:
+        if before:
+            timestamp, pk = decode_cursor(before)
+            queryset = queryset.filter(
+                Q(created_timestamp__gt=timestamp) | Q(created_timestamp=timestamp, pk__gt=pk)
+            ).order_by('created_timestamp', 'pk')
+        elif after:
+            timestamp, pk = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(created_timestamp__lt=timestamp) | Q(created_timestamp=timestamp, pk__lt=pk)
+            ).order_by('-created_timestamp', '-pk')
+        else:
+            queryset = queryset.order_by('-created_timestamp', '-pk')
+    except ValueError:
+        before = after = None
+        queryset = queryset.order_by('-created_timestamp', '-pk')
+
+    # Fetch one extra row to know whether another page follows
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+
+    if before:
+        items.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = bool(after), has_more
+
+    previous_cursor = encode_cursor(items[0]) if items and has_newer else None
+    next_cursor = encode_cursor(items[-1]) if items and has_older else None
+    return items, previous_cursor, next_cursor
+
+
 CURRENCY_SYMBOLS = {
     'USD': '$', 
     'EUR': '€', 
@@ -45,83 +271,3 @@ CURRENCY_SYMBOLS = {
 
 def get_currency_symbol(currency_code):
     return CURRENCY_SYMBOLS.get(currency_code, currency_code)
-
-def generate_pdf(invoice, user):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    elements = []
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=28, textColor=colors.HexColor('#333333'), spaceAfter=20, alignment=TA_RIGHT)
-    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=14, textColor=colors.HexColor('#333333'), spaceAfter=12)
-    business = user.business_profile
-    
-    # Logo handling
-    logo_element = None
-    if business.business_logo:
-        try:
-            logo_path = business.business_logo.path
-            if os.path.exists(logo_path):
-                logo_element = Image(logo_path, width=1.5*inch, height=0.75*inch)
-        except:
-            pass
-    
-    # Company info with or without logo
-    if logo_element:
-        company_info = [[logo_element], [Paragraph(f"<b>{business.business_name}</b>", styles['Normal'])], [Paragraph(f"{business.street_address}<br/>{business.city}, {business.state_province} {business.zip_postal_code}<br/>{business.country}<br/>Email: {business.business_email}<br/>Phone: {business.country_code} {business.phone_number}", styles['Normal'])]]
-        company_table = Table(company_info, colWidths=[3.5*inch])
-    else:
-        company_info = f"<b>{business.business_name}</b><br/>{business.street_address}<br/>{business.city}, {business.state_province} {business.zip_postal_code}<br/>{business.country}<br/>Email: {business.business_email}<br/>Phone: {business.country_code} {business.phone_number}"
-        company_table = Paragraph(company_info, styles['Normal'])
-    
-    invoice_title = Paragraph("INVOICE", title_style)
-    invoice_info = f"<b>Invoice #:</b> {invoice.invoice_number}<br/><b>Date:</b> {invoice.invoice_date.strftime('%B %d, %Y')}<br/><b>Due Date:</b> {invoice.due_date.strftime('%B %d, %Y')}<br/><b>Status:</b> {invoice.get_status_display().upper()}"
-    
-    header_table = Table([[company_table, invoice_title], ['', Paragraph(invoice_info, styles['Normal'])]], colWidths=[3.5*inch, 3.5*inch])
-    header_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP'), ('ALIGN', (1,0), (1,-1), 'RIGHT')]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 30))
-    
-    elements.append(Paragraph("BILL TO", heading_style))
-    client_info = f"<b>{invoice.client.name}</b><br/>{invoice.client.street_address}<br/>{invoice.client.city}, {invoice.client.state_province} {invoice.client.zip_postal_code}<br/>{invoice.client.country}<br/>Email: {invoice.client.email}<br/>Phone: {invoice.client.phone}"
-    client_box = Table([[Paragraph(client_info, styles['Normal'])]], colWidths=[6*inch])
-    client_box.setStyle(TableStyle([('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f9f9f9')), ('PADDING', (0,0), (-1,-1), 12), ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#e0e0e0'))]))
-    elements.append(client_box)
-    elements.append(Spacer(1, 30))
-    
-    elements.append(Paragraph("ITEMS", heading_style))
-    items_data = [['Description', 'Quantity', 'Unit Price', 'Total']]
-    for item in invoice.items.all():
-        items_data.append([item.description, str(item.quantity), f"{invoice.currency} {item.unit_price:.2f}", f"{invoice.currency} {item.line_total:.2f}"])
-    
-    items_table = Table(items_data, colWidths=[3*inch, 1.2*inch, 1.4*inch, 1.4*inch])
-    items_table.setStyle(TableStyle([('BACKGROUND', (0,0), (-1,0), colors.HexColor('#333333')), ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke), ('ALIGN', (1,0), (-1,-1), 'RIGHT'), ('ALIGN', (0,0), (0,-1), 'LEFT'), ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'), ('FONTSIZE', (0,0), (-1,0), 12), ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#dddddd')), ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#f9f9f9')]), ('PADDING', (0,1), (-1,-1), 10)]))
-    elements.append(items_table)
-    elements.append(Spacer(1, 20))
-    
-    totals_data = [['Subtotal:', f"{invoice.currency} {invoice.subtotal:.2f}"], [f'Tax ({invoice.tax_rate}%):', f"{invoice.currency} {invoice.tax_amount:.2f}"]]
-    if invoice.discount_amount > 0:
-        totals_data.append(['Discount:', f"-{invoice.currency} {invoice.discount_amount:.2f}"])
-    totals_data.append(['TOTAL:', f"{invoice.currency} {invoice.total_amount:.2f}"])
-    
-    totals_table = Table(totals_data, colWidths=[5*inch, 2*inch])
-    totals_table.setStyle(TableStyle([('ALIGN', (0,0), (-1,-1), 'RIGHT'), ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'), ('FONTSIZE', (0,-1), (-1,-1), 14), ('LINEABOVE', (0,-1), (-1,-1), 2, colors.HexColor('#333333')), ('BACKGROUND', (0,-1), (-1,-1), colors.HexColor('#f0f0f0'))]))
-    elements.append(totals_table)
-    elements.append(Spacer(1, 20))
-    
-    if invoice.notes:
-        elements.append(Paragraph("NOTES", heading_style))
-        note_box = Table([[Paragraph(invoice.notes, styles['Normal'])]], colWidths=[6.5*inch])
-        note_box.setStyle(TableStyle([('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#fffef0')), ('PADDING', (0,0), (-1,-1), 12), ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#e0e0e0'))]))
-        elements.append(note_box)
-    
-    ad_style = ParagraphStyle('AdStyle', parent=styles['Normal'], fontSize=11, alignment=TA_CENTER, textColor=colors.HexColor('#0066cc'))
-    ad_box = Table([[Paragraph("Simplify Your Invoicing", ad_style)]], colWidths=[6.5*inch])
-    ad_box.setStyle(TableStyle([('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f0f8ff')), ('ALIGN', (0,0), (-1,-1), 'CENTER'), ('PADDING', (0,0), (-1,-1), 15), ('BOX', (0,0), (-1,-1), 2, colors.HexColor('#0066cc'))]))
-    elements.append(ad_box)
-    
-    footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=9, alignment=TA_CENTER, textColor=colors.HexColor('#666666'))
-    elements.append(Spacer(1, 10))
-    elements.append(Paragraph(f"Thank you! - {business.business_name}", footer_style))
-    
-    doc.build(elements)
-    return buffer.getvalue()
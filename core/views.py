@@ -1,26 +1,30 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
-from django.db.models import Sum, Q, Count
-from django.core.mail import send_mail
+from django.core.files.storage import default_storage
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Sum, Q, Count, Min
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils import timezone
 from decimal import Decimal
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-import tempfile
-import os
-from .models import BusinessProfile, Client, Invoice, InvoiceItem, AdClick
+import hashlib
+import json
+from .models import BusinessProfile, Client, Invoice, InvoiceItem, AdClick, UserInvoiceStats, InvoiceExport
 from .forms import (UserRegistrationForm, BusinessProfileForm, ClientForm,
-                    InvoiceForm, InvoiceItemFormSet)
-from .utils import convert_currency, get_currency_symbol
+                    InvoiceForm, InvoiceItemFormSet, InvoiceFilterForm)
+from .calculator import InvoiceCalculator
+from .export import iter_invoice_pdf_zip
+from .outbox import queue_invoice_email
+from .pdf import get_invoice_pdf_cache_key, get_or_render_invoice_pdf, get_pdf_cache_key
+from .pdf_jobs import enqueue_pdf_render, get_pdf_status
+from .utils import convert_amounts, get_currency_symbol, keyset_page
+from .cache import get_cached_dashboard, set_cached_dashboard
 
 def register(request):
     if request.user.is_authenticated:
@@ -78,90 +82,88 @@ def user_logout(request):
     return redirect('login')
 
 
+def build_dashboard_context(user):
+    """
+    Compute the dashboard context for user.
+    Returns (context, timeout) where timeout ends when the next sent invoice turns overdue.
+    """
+    profile = get_object_or_404(BusinessProfile, user=user)
+    invoices = Invoice.objects.filter(user=user)
+    
+    now = timezone.now()
+    recent_invoices = list(invoices.with_effective_status(now).select_related('client').order_by('-created_timestamp')[:5])
+    total_clients = Client.objects.filter(user=user).count()
+    
+    # Statistics and paid/pending/overdue amounts per currency are maintained incrementally
+    totals = UserInvoiceStats.objects.filter(user=user, invoice_count__gt=0)
+    
+    total_invoices = 0
+    overdue_count = 0
+    paid_amounts = {}
+    pending_amounts = {}
+    overdue_amounts = {}
+    
+    for row in totals:
+        total_invoices += row.invoice_count
+        if row.status == 'paid':
+            bucket = paid_amounts
+        elif row.status == 'overdue':
+            bucket = overdue_amounts
+            overdue_count += row.invoice_count
+        else:
+            bucket = pending_amounts
+        bucket[row.currency] = bucket.get(row.currency, Decimal('0')) + row.total_amount
+    
+    # Sent invoices past their due date are overdue even before the scheduled job persists it
+    newly_overdue = invoices.filter(status='sent', due_date__lt=now).order_by().values('currency').annotate(
+        amount=Sum('total_amount'),
+        count=Count('id'),
+    )
+    for row in newly_overdue:
+        overdue_count += row['count']
+        remaining = pending_amounts.get(row['currency'], Decimal('0')) - row['amount']
+        if remaining:
+            pending_amounts[row['currency']] = remaining
+        else:
+            pending_amounts.pop(row['currency'], None)
+        overdue_amounts[row['currency']] = overdue_amounts.get(row['currency'], Decimal('0')) + row['amount']
+    
+    # Calculate totals in preferred currency
+    total_paid = convert_amounts(paid_amounts, profile.preferred_currency)
+    total_pending = convert_amounts(pending_amounts, profile.preferred_currency)
+    total_overdue = convert_amounts(overdue_amounts, profile.preferred_currency)
+    
+    # The dashboard stays valid until data changes or the next sent invoice passes its due date
+    next_due = invoices.filter(status='sent', due_date__gte=now).aggregate(next_due=Min('due_date'))['next_due']
+    timeout = settings.DASHBOARD_CACHE_TIMEOUT
+    if next_due is not None:
+        timeout = min(timeout, int((next_due - now).total_seconds()) + 1)
+    
+    context = {
+        'profile': profile,
+        'total_clients': total_clients,
+        'total_invoices': total_invoices,
+        'total_paid': total_paid,
+        'total_pending': total_pending,
+        'total_overdue': total_overdue,
+        'overdue_count': overdue_count,
+        'paid_amounts': paid_amounts,
+        'pending_amounts': pending_amounts,
+        'overdue_amounts': overdue_amounts,
+        'recent_invoices': recent_invoices,
+        'currency_symbol': get_currency_symbol(profile.preferred_currency),
+    }
+    
+    return context, timeout
+
+
 @login_required
 def dashboard(request):
     try:
-        profile = get_object_or_404(BusinessProfile, user=request.user)
-        clients = Client.objects.filter(user=request.user)
-        invoices = Invoice.objects.filter(user=request.user)
-        
-        # Update overdue invoices in real-time when dashboard loads
-        now = timezone.now()
-        overdue_updated = invoices.filter(status='sent', due_date__lt=now)
-        for inv in overdue_updated:
-            inv.status = 'overdue'
-            inv.save(update_fields=['status', 'last_modified_timestamp'])
-        
-        # Refresh queryset after updates
-        invoices = Invoice.objects.filter(user=request.user)
-        recent_invoices = invoices.order_by('-created_timestamp')[:5]
-        
-        # Calculate statistics
-        total_clients = clients.count()
-        total_invoices = invoices.count()
-        overdue_count = invoices.filter(status='overdue').count()
-        
-        # Calculate paid and pending amounts with currency conversion
-        paid_amounts = {}
-        pending_amounts = {}
-        overdue_amounts = {}
-        
-        for invoice in invoices:
-            if invoice.status == 'paid':
-                if invoice.currency not in paid_amounts:
-                    paid_amounts[invoice.currency] = Decimal('0')
-                paid_amounts[invoice.currency] += invoice.total_amount
-            elif invoice.status == 'overdue':
-                if invoice.currency not in overdue_amounts:
-                    overdue_amounts[invoice.currency] = Decimal('0')
-                overdue_amounts[invoice.currency] += invoice.total_amount
-            else:
-                if invoice.currency not in pending_amounts:
-                    pending_amounts[invoice.currency] = Decimal('0')
-                pending_amounts[invoice.currency] += invoice.total_amount
-        
-        # Calculate totals in preferred currency
-        total_paid = Decimal('0')
-        for currency, amount in paid_amounts.items():
-            try:
-                converted = convert_currency(float(amount), currency, profile.preferred_currency)
-                total_paid += converted
-            except Exception as e:
-                print(f"Error converting {currency} to {profile.preferred_currency}: {e}")
-                total_paid += amount
-        
-        total_pending = Decimal('0')
-        for currency, amount in pending_amounts.items():
-            try:
-                converted = convert_currency(float(amount), currency, profile.preferred_currency)
-                total_pending += converted
-            except Exception as e:
-                print(f"Error converting {currency} to {profile.preferred_currency}: {e}")
-                total_pending += amount
-        
-        total_overdue = Decimal('0')
-        for currency, amount in overdue_amounts.items():
-            try:
-                converted = convert_currency(float(amount), currency, profile.preferred_currency)
-                total_overdue += converted
-            except Exception as e:
-                print(f"Error converting {currency} to {profile.preferred_currency}: {e}")
-                total_overdue += amount
-        
-        context = {
-            'profile': profile,
-            'total_clients': total_clients,
-            'total_invoices': total_invoices,
-            'total_paid': total_paid,
-            'total_pending': total_pending,
-            'total_overdue': total_overdue,
-            'overdue_count': overdue_count,
-            'paid_amounts': paid_amounts,
-            'pending_amounts': pending_amounts,
-            'overdue_amounts': overdue_amounts,
-            'recent_invoices': recent_invoices,
-            'currency_symbol': get_currency_symbol(profile.preferred_currency),
-        }
+        context, version = get_cached_dashboard(request.user.pk)
+        if context is None:
+            context, timeout = build_dashboard_context(request.user)
+            set_cached_dashboard(request.user.pk, version, context, timeout)
         
         return render(request, 'dashboard/index.html', context)
     except Exception as e:
@@ -260,7 +262,9 @@ def client_delete(request, pk):
 @login_required
 def client_detail(request, pk):
     client = get_object_or_404(Client, pk=pk, user=request.user)
-    invoices = Invoice.objects.filter(client=client)
+    invoices = Invoice.objects.filter(client=client).with_effective_status().only(
+        'invoice_number', 'invoice_date', 'due_date', 'status', 'currency', 'total_amount',
+    )
     
     return render(request, 'clients/client_detail.html', {
         'client': client,
@@ -270,30 +274,54 @@ def client_detail(request, pk):
 
 @login_required
 def invoice_list(request):
+    now = timezone.now()
     invoices = Invoice.objects.filter(user=request.user)
     
-    # Update overdue invoices in real-time
-    now = timezone.now()
-    overdue_to_update = invoices.filter(status='sent', due_date__lt=now)
-    for inv in overdue_to_update:
-        inv.status = 'overdue'
-        inv.save(update_fields=['status', 'last_modified_timestamp'])
+    # Count by effective status in a single query
+    counts = invoices.aggregate(
+        draft_count=Count('pk', filter=Q(status='draft')),
+        sent_count=Count('pk', filter=Q(status='sent', due_date__gte=now)),
+        paid_count=Count('pk', filter=Q(status='paid')),
+        overdue_count=Count('pk', filter=Q(status='overdue') | Q(status='sent', due_date__lt=now)),
+    )
     
-    # Refresh queryset
-    invoices = Invoice.objects.filter(user=request.user)
+    # Filters are pushed into SQL and the list is keyset-paginated
+    filter_form = InvoiceFilterForm(request.GET or None, user=request.user)
+    filtered = invoices.with_effective_status(now).select_related('client').only(
+        'invoice_number', 'invoice_date', 'due_date', 'status', 'currency',
+        'total_amount', 'created_timestamp', 'client__name',
+    )
+    if filter_form.is_valid():
+        filtered = filter_form.filter_queryset(filtered, now)
     
-    # Count by status
-    draft_count = invoices.filter(status='draft').count()
-    sent_count = invoices.filter(status='sent').count()
-    paid_count = invoices.filter(status='paid').count()
-    overdue_count = invoices.filter(status='overdue').count()
+    page, previous_cursor, next_cursor = keyset_page(
+        filtered,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    for invoice in page:
+        invoice.as_of = now
+    
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    previous_query = next_query = None
+    if previous_cursor:
+        params['before'] = previous_cursor
+        previous_query = params.urlencode()
+        params.pop('before')
+    if next_cursor:
+        params['after'] = next_cursor
+        next_query = params.urlencode()
     
     return render(request, 'invoices/invoice_list.html', {
-        'invoices': invoices,
-        'draft_count': draft_count,
-        'sent_count': sent_count,
-        'paid_count': paid_count,
-        'overdue_count': overdue_count,
+        'invoices': page,
+        'filter_form': filter_form,
+        'is_filtered': any(request.GET.get(name) for name in filter_form.fields),
+        'previous_query': previous_query,
+        'next_query': next_query,
+        'total_count': sum(counts.values()),
+        **counts,
     })
 
 
@@ -304,36 +332,22 @@ def invoice_create(request):
         formset = InvoiceItemFormSet(request.POST)
         
         if form.is_valid() and formset.is_valid():
-            invoice = form.save(commit=False)
-            invoice.user = request.user
-            
-            # Calculate subtotal from items
-            subtotal = Decimal('0')
-            for item_form in formset:
-                if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE'):
-                    qty = item_form.cleaned_data.get('quantity', 0)
-                    price = item_form.cleaned_data.get('unit_price', 0)
-                    subtotal += qty * price
-            
-            invoice.subtotal = subtotal
-            invoice.save()
-            
-            # Save items
-            formset.instance = invoice
-            for i, item_form in enumerate(formset):
-                if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE'):
-                    item = item_form.save(commit=False)
-                    item.invoice = invoice
-                    item.order_position = i
-                    item.save()
+            # The invoice and all of its items are written together or not at all
+            with transaction.atomic():
+                invoice = form.save(commit=False)
+                invoice.user = request.user
+                items = formset.get_items()
+                InvoiceCalculator.for_invoice(invoice).apply(invoice, items)
+                invoice.save()
+                formset.save_items(invoice, items)
+                
+                # Queue the email and the PDF render if status is "sent"; both run in the background
+                if invoice.status == 'sent':
+                    queue_invoice_email(invoice)
+                    enqueue_pdf_render(invoice)
             
-            # Send email if status is "sent"
             if invoice.status == 'sent':
-                try:
-                    send_invoice_email(invoice)
-                    messages.success(request, f'Invoice {invoice.invoice_number} created and email sent to {invoice.client.email}!')
-                except Exception as e:
-                    messages.warning(request, f'Invoice created but email failed to send: {str(e)}')
+                messages.success(request, f'Invoice {invoice.invoice_number} created and email queued to {invoice.client.email}!')
             else:
                 messages.success(request, f'Invoice {invoice.invoice_number} created successfully!')
             
@@ -358,28 +372,21 @@ def invoice_edit(request, pk):
         formset = InvoiceItemFormSet(request.POST, instance=invoice)
         
         if form.is_valid() and formset.is_valid():
-            # Calculate subtotal
-            subtotal = Decimal('0')
-            for item_form in formset:
-                if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE'):
-                    qty = item_form.cleaned_data.get('quantity', 0)
-                    price = item_form.cleaned_data.get('unit_price', 0)
-                    subtotal += qty * price
-            
-            invoice = form.save(commit=False)
-            invoice.subtotal = subtotal
-            new_status = invoice.status  # Get the new status
-            invoice.save()
-            
-            formset.save()
+            with transaction.atomic():
+                invoice = form.save(commit=False)
+                items = formset.get_items()
+                InvoiceCalculator.for_invoice(invoice).apply(invoice, items)
+                new_status = invoice.status  # Get the new status
+                invoice.save()
+                formset.save_items(invoice, items)
+                
+                # Queue the email ONLY if status CHANGED to "sent", and warm the PDF before the client opens it
+                if old_status != 'sent' and new_status == 'sent':
+                    queue_invoice_email(invoice)
+                    enqueue_pdf_render(invoice)
             
-            # Send email ONLY if status CHANGED to "sent"
             if old_status != 'sent' and new_status == 'sent':
-                try:
-                    send_invoice_email(invoice)
-                    messages.success(request, f'Invoice {invoice.invoice_number} updated and email sent to {invoice.client.email}!')
-                except Exception as e:
-                    messages.warning(request, f'Invoice updated but email failed to send: {str(e)}')
+                messages.success(request, f'Invoice {invoice.invoice_number} updated and email queued to {invoice.client.email}!')
             else:
                 messages.success(request, f'Invoice {invoice.invoice_number} updated successfully!')
             
@@ -405,15 +412,42 @@ def invoice_delete(request, pk):
     return redirect('invoice_list')
 
 
+def get_invoice_detail_source(request, pk):
+    """Invoice and profile behind invoice_detail, loaded once per request."""
+    if not hasattr(request, '_invoice_detail_source'):
+        # The ETag and the page read the clock once, so they describe the same moment
+        now = timezone.now()
+        invoice = get_object_or_404(
+            Invoice.objects.with_effective_status(now).select_related('client').prefetch_related('items'),
+            pk=pk, user=request.user
+        )
+        profile = get_object_or_404(BusinessProfile, user=request.user)
+        invoice.as_of = now
+        request._invoice_detail_source = (invoice, profile)
+    return request._invoice_detail_source
+
+
+def invoice_detail_etag(request, pk):
+    # Pending messages are shown on the next page, so that page must be rendered
+    if messages.get_messages(request):
+        return None
+    invoice, profile = get_invoice_detail_source(request, pk)
+    # The PDF content hash covers the invoice, items, client, profile and logo, even when a change
+    # does not touch the invoice row; the rest is what only the page shows. is_expired and
+    # days_until_due move at the due date's time of day, so they are hashed as rendered.
+    content = [
+        get_pdf_cache_key(invoice, profile, invoice.items.all()),
+        invoice.effective_status, invoice.is_expired(), invoice.days_until_due(), invoice.pdf_generated,
+        invoice.created_timestamp.isoformat(), invoice.last_modified_timestamp.isoformat(),
+    ]
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=invoice_detail_etag)
 def invoice_detail(request, pk):
-    invoice = get_object_or_404(Invoice, pk=pk, user=request.user)
-    profile = get_object_or_404(BusinessProfile, user=request.user)
-    
-    # Check if invoice should be overdue
-    if invoice.is_overdue():
-        invoice.status = 'overdue'
-        invoice.save(update_fields=['status', 'last_modified_timestamp'])
+    invoice, profile = get_invoice_detail_source(request, pk)
     
     return render(request, 'invoices/invoice_detail.html', {
         'invoice': invoice,
@@ -432,236 +466,134 @@ def invoice_confirmation(request, pk):
     })
 
 
+def get_invoice_pdf_source(request, pk):
+    """Invoice and profile behind invoice_pdf, loaded once per request. Items are streamed when needed."""
+    if not hasattr(request, '_invoice_pdf_source'):
+        invoice = get_object_or_404(Invoice.objects.select_related('client'), pk=pk, user=request.user)
+        profile = get_object_or_404(BusinessProfile, user=request.user)
+        request._invoice_pdf_source = (invoice, profile)
+    return request._invoice_pdf_source
+
+
+def invoice_pdf_etag(request, pk):
+    # The content hash of the PDF, so any change that alters the document changes the ETag
+    if not hasattr(request, '_invoice_pdf_etag'):
+        request._invoice_pdf_etag = get_invoice_pdf_cache_key(*get_invoice_pdf_source(request, pk))
+    return request._invoice_pdf_etag
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
 def invoice_pdf(request, pk):
-    invoice = get_object_or_404(Invoice, pk=pk, user=request.user)
-    profile = get_object_or_404(BusinessProfile, user=request.user)
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Invoice-{invoice.invoice_number}.pdf"'
-    
-    doc = SimpleDocTemplate(response, pagesize=letter, 
-                           topMargin=0.3*inch, 
-                           bottomMargin=0.75*inch,
-                           leftMargin=0.75*inch,
-                           rightMargin=0.75*inch)
-    elements = []
-    styles = getSampleStyleSheet()
-    currency_symbol = get_currency_symbol(invoice.currency)
-    
-    # ==================== HEADER ====================
-    # Left side - Company info
-    left_content = []
-    
-    # Add logo if exists
-    if profile.business_logo:
-        try:
-            logo_path = os.path.join(settings.MEDIA_ROOT, str(profile.business_logo))
-            if os.path.exists(logo_path):
-                img = Image(logo_path)
-                img_width, img_height = img.imageWidth, img.imageHeight
-                max_width = 150
-                max_height = 80
-                aspect = img_height / float(img_width)
-                
-                if img_width > max_width:
-                    img_width = max_width
-                    img_height = img_width * aspect
-                if img_height > max_height:
-                    img_height = max_height
-                    img_width = img_height / aspect
-                
-                img.drawWidth = img_width
-                img.drawHeight = img_height
-                left_content.append(img)
-                left_content.append(Spacer(1, 0.1*inch))
-        except Exception as e:
-            print(f"Error loading logo: {e}")
-    
-    company_style = ParagraphStyle('Company', parent=styles['Normal'], fontSize=11, leading=14)
-    
-    left_content.append(Paragraph(f"<b>{profile.business_name}</b>", company_style))
-    left_content.append(Paragraph(profile.street_address, company_style))
-    left_content.append(Paragraph(f"{profile.city}, {profile.state_province} {profile.zip_postal_code}", company_style))
-    left_content.append(Paragraph(profile.country, company_style))
-    left_content.append(Paragraph(f"Email: {profile.business_email}", company_style))
-    left_content.append(Paragraph(f"Phone: {profile.phone_country_code} {profile.phone_number}", company_style))
-    
-    # Right side - Invoice title and info
-    right_content = []
-    
-    invoice_title_style = ParagraphStyle('InvoiceTitle', parent=styles['Heading1'], 
-                                        fontSize=28, fontName='Helvetica-Bold',
-                                        textColor=colors.HexColor('#333333'),
-                                        alignment=TA_RIGHT, spaceAfter=10)
-    
-    invoice_info_style = ParagraphStyle('InvoiceInfo', parent=styles['Normal'],
-                                       fontSize=11, leading=14, alignment=TA_RIGHT)
-    
-    right_content.append(Paragraph("INVOICE", invoice_title_style))
-    right_content.append(Paragraph(f"<b>Invoice #:</b> {invoice.invoice_number}", invoice_info_style))
-    right_content.append(Paragraph(f"<b>Date:</b> {invoice.invoice_date.strftime('%B %d, %Y')}", invoice_info_style))
-    right_content.append(Paragraph(f"<b>Due Date:</b> {invoice.due_date.strftime('%B %d, %Y')}", invoice_info_style))
-    right_content.append(Paragraph(f"<b>Status:</b> {invoice.get_status_display().upper()}", invoice_info_style))
-    
-    # Header table
-    header_data = [[left_content, right_content]]
-    header_table = Table(header_data, colWidths=[3.25*inch, 3.25*inch])
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-    ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # ==================== BILL TO ====================
-    bill_to_style = ParagraphStyle('BillTo', parent=styles['Heading2'], 
-                                   fontSize=12, fontName='Helvetica-Bold')
-    client_style = ParagraphStyle('Client', parent=styles['Normal'], fontSize=11, leading=14)
-    
-    elements.append(Paragraph("Bill To:", bill_to_style))
-    elements.append(Spacer(1, 0.1*inch))
-    elements.append(Paragraph(f"<b>{invoice.client.name}</b>", client_style))
-    elements.append(Paragraph(invoice.client.street_address, client_style))
-    elements.append(Paragraph(f"{invoice.client.city}, {invoice.client.state_province} {invoice.client.zip_postal_code}", client_style))
-    elements.append(Paragraph(invoice.client.country, client_style))
-    elements.append(Paragraph(f"Email: {invoice.client.email}", client_style))
-    elements.append(Paragraph(f"Phone: {invoice.client.phone}", client_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # ==================== LINE ITEMS TABLE ====================
-    items_data = [['Description', 'Quantity', 'Unit Price', 'Total']]
-    
-    for item in invoice.items.all():
-        items_data.append([
-            item.description,
-            str(item.quantity),
-            "{0}{1}".format(currency_symbol, item.unit_price),
-            "{0}{1}".format(currency_symbol, item.line_total)
-        ])
-    
-    items_table = Table(items_data, colWidths=[3*inch, 1*inch, 1.25*inch, 1.25*inch])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (1, 0), (-1, 0), 'RIGHT'),
-        ('TOPPADDING', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(items_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # ==================== TOTALS SECTION ====================
-    # Create plain text strings WITHOUT any HTML tags
-    subtotal_value = "{0}{1}".format(currency_symbol, invoice.subtotal)
-    tax_value = "{0}{1}".format(currency_symbol, invoice.tax_amount)
-    discount_value = "{0}{1}".format(currency_symbol, invoice.discount_amount)
-    total_value = "{0}{1}".format(currency_symbol, invoice.total_amount)
-    
-    # Regular totals
-    totals_data = [
-        ['Subtotal:', subtotal_value],
-        ['Tax ({0}%):'.format(invoice.tax_rate), tax_value],
-        ['Discount:', discount_value],
-    ]
-    
-    totals_table = Table(totals_data, colWidths=[4.5*inch, 2*inch])
-    totals_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
-    elements.append(totals_table)
-    
-    # Total row - separate table with bold styling
-    total_data = [['Total:', total_value]]
-    
-    total_table = Table(total_data, colWidths=[4.5*inch, 2*inch])
-    total_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),
-        ('LINEABOVE', (0, 0), (-1, 0), 2, colors.black),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f0f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(total_table)
-    
-    # ==================== NOTES ====================
-    if invoice.notes:
-        elements.append(Spacer(1, 0.4*inch))
-        
-        notes_heading_style = ParagraphStyle('NotesHeading', parent=styles['Heading2'],
-                                            fontSize=12, fontName='Helvetica-Bold')
-        notes_text_style = ParagraphStyle('NotesText', parent=styles['Normal'],
-                                         fontSize=10, leading=14)
-        
-        elements.append(Paragraph("Notes:", notes_heading_style))
-        elements.append(Spacer(1, 0.1*inch))
-        
-        notes_data = [[Paragraph(invoice.notes, notes_text_style)]]
-        notes_table = Table(notes_data, colWidths=[6.5*inch])
-        notes_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f9f9f9')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('LINEABOVE', (0, 0), (-1, 0), 4, colors.HexColor('#007bff')),
-        ]))
-        elements.append(notes_table)
-        elements.append(Spacer(1, 0.3*inch))
-    
-    # ==================== FOOTER ====================
-    elements.append(Spacer(1, 0.5*inch))
-    
-    footer_text_style = ParagraphStyle('FooterText', parent=styles['Normal'],
-                                      fontSize=9, alignment=TA_CENTER, leading=12)
-    
-    footer_ad = "💼 Simplify Your Business - Try our complete accounting suite at www.example.com/accounting"
-    footer_data = [[Paragraph(footer_ad, footer_text_style)]]
-    
-    footer_table = Table(footer_data, colWidths=[6.5*inch])
-    footer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fff3cd')),
-        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#ffc107')),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    elements.append(footer_table)
-    
-    elements.append(Spacer(1, 0.1*inch))
-    
-    business_footer = "Thank you for your business! | {0} | {1}".format(
-        profile.business_name, profile.business_email)
-    business_footer_style = ParagraphStyle('BusinessFooter', parent=styles['Normal'],
-                                          fontSize=8, alignment=TA_CENTER,
-                                          textColor=colors.HexColor('#666666'))
-    elements.append(Paragraph(business_footer, business_footer_style))
-    
-    # ==================== BUILD ====================
-    doc.build(elements)
-    
-    invoice.pdf_generated = True
-    invoice.save()
-    
+    invoice, profile = get_invoice_pdf_source(request, pk)
+    
+    # Large uncached invoices are rendered by the scheduler's PDF worker instead of tying up this worker.
+    # The count stops at the threshold, so long invoices are not counted in full.
+    if invoice.items.all()[:settings.PDF_ASYNC_MIN_ITEMS].count() >= settings.PDF_ASYNC_MIN_ITEMS:
+        # A queued or running render is waited for without hashing the items
+        status = get_pdf_status(invoice)
+        if status not in ('pending', 'running'):
+            status = get_pdf_status(invoice, cache_key=invoice_pdf_etag(request, pk))
+        if status in (None, 'failed'):
+            status = enqueue_pdf_render(invoice).status
+        if status != 'ready':
+            return render(request, 'invoices/invoice_pdf_pending.html', {'invoice': invoice}, status=202)
+    
+    return serve_invoice_pdf(request, pk)
+
+
+# No Last-Modified: the invoice's timestamp misses item, client and logo changes, and
+# If-Modified-Since alone would then get a stale 304
+@condition(etag_func=invoice_pdf_etag)
+def serve_invoice_pdf(request, pk):
+    invoice, profile = get_invoice_pdf_source(request, pk)
+    
+    # Renders only when the invoice, its items, the profile or the logo changed since the last download
+    path = get_or_render_invoice_pdf(invoice, profile, cache_key=invoice_pdf_etag(request, pk))
+    
+    if not invoice.pdf_generated:
+        # Targeted update: a full save would recompute totals and bump last_modified_timestamp
+        Invoice.objects.filter(pk=invoice.pk).update(pdf_generated=True)
+    
+    # Streamed from storage in chunks rather than buffered in memory
+    return FileResponse(
+        default_storage.open(path, 'rb'),
+        as_attachment=True,
+        filename=f'Invoice-{invoice.invoice_number}.pdf',
+        content_type='application/pdf',
+    )
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+def invoice_pdf_status(request, pk):
+    """Polled by the pending page until the queued PDF is ready to download. Reads only the render job."""
+    invoice = get_object_or_404(Invoice.objects.only('pk'), pk=pk, user=request.user)
+    status = get_pdf_status(invoice)
+    return JsonResponse({
+        'status': status or 'missing',
+        'url': reverse('invoice_pdf', args=[invoice.pk]) if status == 'ready' else None,
+    })
+
+
+@login_required
+def invoice_export(request):
+    """ZIP of the PDFs of every invoice matching the invoice list filters."""
+    filter_form = InvoiceFilterForm(request.GET or None, user=request.user)
+    invoices = Invoice.objects.filter(user=request.user)
+    if filter_form.is_bound:
+        if not filter_form.is_valid():
+            messages.error(request, 'Please correct the filters before exporting.')
+            return redirect('invoice_list')
+        invoices = filter_form.filter_queryset(invoices)
+    
+    invoice_pks = list(invoices.order_by('invoice_date', 'pk').values_list('pk', flat=True))
+    if not invoice_pks:
+        messages.info(request, 'No invoices match these filters.')
+        return redirect('invoice_list')
+    
+    # Large exports are built by the scheduler's PDF worker so they never outlast the request timeout
+    if len(invoice_pks) > settings.PDF_EXPORT_SYNC_MAX_INVOICES:
+        export = InvoiceExport.objects.create(user=request.user, invoice_ids=invoice_pks)
+        return redirect('invoice_export_detail', pk=export.pk)
+    
+    # Rendered one at a time in this process and written to the response as each PDF is ready
+    response = StreamingHttpResponse(iter_invoice_pdf_zip(invoice_pks, workers=1), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="invoices-{timezone.localdate():%Y-%m-%d}.zip"'
     return response
 
 
+@login_required
+def invoice_export_detail(request, pk):
+    """Waits for a queued export and starts its download once built."""
+    export = get_object_or_404(InvoiceExport, pk=pk, user=request.user)
+    return render(request, 'invoices/invoice_export.html', {'export': export})
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+def invoice_export_status(request, pk):
+    """Polled by the export page until the ZIP is ready to download."""
+    status = get_object_or_404(
+        InvoiceExport.objects.values_list('status', flat=True), pk=pk, user=request.user
+    )
+    return JsonResponse({
+        'status': status,
+        'url': reverse('invoice_export_download', args=[pk]) if status == 'done' else None,
+    })
+
+
+@login_required
+def invoice_export_download(request, pk):
+    export = get_object_or_404(InvoiceExport, pk=pk, user=request.user, status='done')
+    return FileResponse(
+        export.file.open('rb'),
+        as_attachment=True,
+        filename=f'invoices-{timezone.localtime(export.requested_at):%Y-%m-%d}.zip',
+        content_type='application/zip',
+    )
+
+
 @login_required
 def track_ad_click(request):
     if request.method == 'POST':
@@ -684,32 +616,3 @@ def track_ad_click(request):
         return JsonResponse({'success': True, 'click_id': ad_click.id})
     
     return JsonResponse({'success': False}, status=400)
-
-
-def send_invoice_email(invoice):
-    """Send invoice to client via email"""
-    subject = f'Invoice {invoice.invoice_number} from {invoice.user.business_profile.business_name}'
-    message = f"""
-    Dear {invoice.client.name},
-    
-    Please find attached your invoice {invoice.invoice_number}.
-    
-    Invoice Details:
-    - Invoice Number: {invoice.invoice_number}
-    - Date: {invoice.invoice_date.strftime('%B %d, %Y')}
-    - Due Date: {invoice.due_date.strftime('%B %d, %Y')}
-    - Total Amount: {get_currency_symbol(invoice.currency)}{invoice.total_amount}
-    
-    Thank you for your business!
-    
-    Best regards,
-    {invoice.user.business_profile.business_name}
-    """
-    
-    from_email = settings.DEFAULT_FROM_EMAIL
-    recipient_list = [invoice.client.email]
-    
-    try:
-        send_mail(subject, message, from_email, recipient_list)
-    except Exception as e:
-        print(f"Error sending email: {e}")
\ No newline at end of file
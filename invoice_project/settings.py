@@ -143,8 +143,17 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGIN_URL = 'login'
 
+# Most line items one invoice form accepts
+INVOICE_MAX_ITEMS = int(os.getenv('INVOICE_MAX_ITEMS', 2000))
+
+# Each invoice line posts up to five fields (id, description, quantity, unit_price and DELETE);
+# budget six per line, plus the invoice's own fields and the formset management form
+DATA_UPLOAD_MAX_NUMBER_FIELDS = INVOICE_MAX_ITEMS * 6 + 100
+
 # Email configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Use django.core.mail.backends.locmem.EmailBackend or .filebackend.EmailBackend (with EMAIL_FILE_PATH) to test without SMTP
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
@@ -152,6 +161,11 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', 'your-email@gmail.com')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', 'your-password')
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER', 'your-email@gmail.com')
 
+# Queued emails are delivered by the scheduler in batches over one SMTP connection,
+# and marked failed after EMAIL_OUTBOX_MAX_ATTEMPTS tries with exponential backoff
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Timezone settings
@@ -168,7 +182,64 @@ SCHEDULER_CONFIG = {
     },
 }
 
-SCHEDULER_AUTOSTART = True
+# Set SCHEDULER_AUTOSTART=False on web processes when a separate `manage.py run_scheduler` worker runs the jobs
+SCHEDULER_AUTOSTART = os.getenv('SCHEDULER_AUTOSTART', 'True') == 'True'
+
+# Size of the job thread pool used by `manage.py run_scheduler`
+SCHEDULER_THREADS = int(os.getenv('SCHEDULER_THREADS', 4))
+
+# The scheduler keeps sent invoices due within OVERDUE_TIMER_HORIZON seconds in memory and
+# picks up ones saved by other processes every OVERDUE_TIMER_REFRESH_INTERVAL seconds
+OVERDUE_TIMER_HORIZON = int(os.getenv('OVERDUE_TIMER_HORIZON', 24 * 60 * 60))
+OVERDUE_TIMER_REFRESH_INTERVAL = int(os.getenv('OVERDUE_TIMER_REFRESH_INTERVAL', 60))
+
+# Leader election so only one process runs the scheduler: a PostgreSQL advisory lock,
+# or a lock file on other databases; standby processes retry every SCHEDULER_LEADER_INTERVAL seconds
+SCHEDULER_LOCK_ID = int(os.getenv('SCHEDULER_LOCK_ID', 814_227_301))
+SCHEDULER_LOCK_FILE = os.getenv('SCHEDULER_LOCK_FILE')  # defaults to a file in the system temp dir
+SCHEDULER_LEADER_INTERVAL = int(os.getenv('SCHEDULER_LEADER_INTERVAL', 30))
+
+# Exchange rate tables are kept in process memory and re-read from the stored snapshot after this many seconds
+EXCHANGE_RATE_CACHE_TTL = int(os.getenv('EXCHANGE_RATE_CACHE_TTL', 6 * 60 * 60))
+
+# Cache configuration
+# Use Redis when REDIS_URL is set so every worker sees dashboard invalidations.
+# Dashboards are only cached on a shared backend: with the per-process fallback
+# an invalidation in one gunicorn worker would not reach the others (core/cache.py)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a user's dashboard stays cached between invalidations
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 300))
+
+# Worker processes rendering PDFs for a ZIP export; empty uses one per CPU core
+PDF_EXPORT_WORKERS = int(os.getenv('PDF_EXPORT_WORKERS') or 0) or None
+
+# Exports of up to this many invoices are streamed from the web request, rendered one at a time;
+# larger ones are built by the scheduler's PDF worker and downloaded once ready
+PDF_EXPORT_SYNC_MAX_INVOICES = int(os.getenv('PDF_EXPORT_SYNC_MAX_INVOICES', 20))
+
+# Seconds a built export is kept for download
+INVOICE_EXPORT_MAX_AGE = int(os.getenv('INVOICE_EXPORT_MAX_AGE', 86400))
+
+# Downloads of uncached PDFs with at least PDF_ASYNC_MIN_ITEMS line items are rendered by the
+# scheduler's PDF worker, which polls for jobs every PDF_RENDER_POLL_INTERVAL seconds
+PDF_ASYNC_MIN_ITEMS = int(os.getenv('PDF_ASYNC_MIN_ITEMS', 200))
+PDF_RENDER_POLL_INTERVAL = int(os.getenv('PDF_RENDER_POLL_INTERVAL', 5))
+PDF_RENDER_BATCH_SIZE = int(os.getenv('PDF_RENDER_BATCH_SIZE', 20))
+PDF_RENDER_MAX_ATTEMPTS = int(os.getenv('PDF_RENDER_MAX_ATTEMPTS', 3))
 
 # Logging configuration
 LOGGING = {